@@ -1,66 +1,49 @@
-import requests
-import json
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
-class AddToInventoryToolArgs(BaseModel):
-    query: str = Field(
+from utils.write_behind import get_write_behind_queue
+
+class GroceryItem(BaseModel):
+    name: str = Field(description="Name of the item, e.g. \"Apples\".")
+    amount: int | float = Field(description="Amount of the item, 1 if the user gives no amount.")
+    unit: str = Field(
         description=(
-            "Extract the inventory item details from the user's request in valid JSON format.\n"
-            "Return **ONLY** a JSON object like this:\n"
-            '{ "name": "Apples", "amount": 2, "unit": "pcs" }\n\n'
             "For solid items (apples, bananas, carrots), use 'pcs'.\n"
             "For liquids (milk, water), use 'ml' or 'liters'.\n"
             "For powdered items (rice, flour, sugar), use 'gr'.\n"
-            "For packaged items (cheese, butter), use 'pkg'.\n"
-            "Ensure the JSON response contains **NO additional text**."
+            "For packaged items (cheese, butter), use 'pkg'."
         )
     )
 
-@tool("add_to_inventory", args_schema=AddToInventoryToolArgs)
-def add_to_inventory_tool(query):
-    """Extracts an item from user input and adds it to the inventory storage."""
-    return process(query)
+class AddToInventoryToolArgs(BaseModel):
+    items: list[GroceryItem] = Field(
+        description="ALL items the user wants to add, one entry per item, e.g. \"two apples and milk\" are two entries."
+    )
 
-def process(query: str):
-    """Extracts item details and adds them to the inventory storage."""
-    inventory_url = "http://130.149.154.54:3000/storage"
+@tool("add_to_inventory", args_schema=AddToInventoryToolArgs)
+def add_to_inventory_tool(items):
+    """Adds one or more items from the user's request to the inventory storage in a single call."""
+    return process(items)
 
-    if not query:
+def process(items: list):
+    """Queues all items for the inventory storage and confirms them without waiting for the server."""
+    if not items:
         return "I couldn't understand the item details. Please try again."
 
-    data = {
-        "Name": query["name"],
-        "Amount": query["amount"],
-        "Unit": query["unit"]
-    }
-
-    headers = {"Content-Type": "application/json"}
+    data = [{
+        "Name": item.name,
+        "Amount": item.amount,
+        "Unit": item.unit
+    } for item in map(GroceryItem.model_validate, items)]
 
     try:
-        response = requests.post(inventory_url, headers=headers, json=data)
-
-        print(f" Request Sent: {json.dumps(data, indent=4)}")
-        print(f" Response Status Code: {response.status_code}")
-        print(f" Response Body: {response.text}")
-
-        # Handling different success cases
-        if response.status_code in [200, 201]:
-            try:
-                response_json = response.json()
-                if "state" in response_json:
-                    return f" {data['Amount']} {data['Unit']} of {data['Name']} has been successfully added to your inventory."
-                elif "ID" in response_json:
-                    return f" {data['Amount']} {data['Unit']} of {data['Name']} has been successfully added. ID: {response_json['ID']}"
-                else:
-                    return f" Unexpected response format: {response_json}"
-            except json.JSONDecodeError:
-                return f" Could not parse JSON response: {response.text}"
-
-        else:
-            return f" Error: Could not add item to inventory. Server returned status {response.status_code}."
-
-    except requests.exceptions.RequestException as req_err:
-        return f" Network issue while adding item to inventory: {str(req_err)}"
+        # Written to the local queue and sent in the background, retried until the server has them
+        queue = get_write_behind_queue()
+        for item in data:
+            queue.enqueue("storage", item)
+        return f" {describe_items(data)} added to your inventory."
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
+
+def describe_items(items: list[dict]) -> str:
+    return ", ".join(f"{item['Amount']} {item['Unit']} of {item['Name']}" for item in items)
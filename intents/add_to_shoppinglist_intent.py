@@ -7,56 +7,43 @@ from datetime import datetime
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
+from utils.write_behind import get_write_behind_queue
+from intents.add_to_inventory_intent import GroceryItem, describe_items
+
 class AddToShoppingListToolArgs(BaseModel):
-    query: str = Field(
-        description=(
-            "Extract the inventory item details from the user's request in valid JSON format.\n"
-            "Return **ONLY** a JSON object like this:\n"
-            '{ "name": "Apples", "amount": 2, "unit": "pcs" }\n\n'
-            "For solid items (apples, bananas, carrots), use 'pcs'.\n"
-            "For liquids (milk, water), use 'ml' or 'liters'.\n"
-            "For powdered items (rice, flour, sugar), use 'gr'.\n"
-            "For packaged items (cheese, butter), use 'pkg'.\n"
-            "Ensure the JSON response contains **NO additional text**."
-        )
+    items: list[GroceryItem] = Field(
+        description="ALL items the user wants to add, one entry per item, e.g. \"two apples, milk and flour\" are three entries."
     )
 
 @tool("add_items_to_shoppinglist", args_schema=AddToShoppingListToolArgs)
-def add_items_to_shoppinglist_tool(query):
-    """Extracts an item from user input and adds it to the shopping list."""
-    return process(query)
+def add_items_to_shoppinglist_tool(items):
+    """Adds one or more items from the user's request to the shopping list in a single call."""
+    return process(items)
 
 def get_today_date():
     """Returns today's date formatted as 'Tue Jan 21 2025'."""
     return datetime.today().strftime("%a %b %d %Y")  # Matches the shopping list format.
 
-def process(query: str):
-    """Extracts item details and adds it to today's shopping list."""
-    shopping_list_url = "http://130.149.154.54:3000/shopping_list"
+def process(items: list):
+    """Queues all items for today's shopping list and confirms them without waiting for the server."""
     today_date = get_today_date()
 
-    if not query:
+    if not items:
         return "I couldn't understand the item details. Please try again."
 
-    data = {
-        "Name": query["name"],
-        "Amount": query["amount"],
-        "Unit": query["unit"],
+    data = [{
+        "Name": item.name,
+        "Amount": item.amount,
+        "Unit": item.unit,
         "Checked": False,  # Default to unchecked
         "List": f"0 - {today_date}"  # Assigning today's shopping list
-    }
-
-    headers = {"Content-Type": "application/json"}
+    } for item in map(GroceryItem.model_validate, items)]
 
     try:
-        response = requests.post(shopping_list_url, headers=headers, json=data)
-
-        if response.status_code == 201:
-            return f" {query['amount']} {query['unit']} of {query['name']} has been added to your shopping list."
-        else:
-            return f" Error: Could not add item to the shopping list. Server returned status code {response.status_code}."
-
-    except requests.exceptions.RequestException as req_err:
-        return f" Network issue while adding the item to the shopping list: {str(req_err)}"
+        # Written to the local queue and sent in the background, retried until the server has them
+        queue = get_write_behind_queue()
+        for item in data:
+            queue.enqueue("shopping_list", item)
+        return f" {describe_items(data)} added to your shopping list."
     except Exception as e:
-        return f" An unexpected issue occurred while adding the item to the shopping list: {str(e)}"
+        return f" An unexpected issue occurred while adding the items to the shopping list: {str(e)}"
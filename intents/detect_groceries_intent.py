@@ -1,47 +1,39 @@
-import base64
 import requests
 import os
 import dotenv
+from typing import Literal, Optional
+from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
+from utils.http_client import get_http_client
+from utils.image_capture import capture_frame, prepare_image, image_data_url, CaptureError
+from utils.constants import OPENAI_API_URL, VISION_DETAIL, VISION_MAX_SIDE, VISION_LOW_DETAIL_SIDE
 
-@tool("detect_groceries")
-def detect_groceries_tool():
-    """Use this tool when asked to scan the cupboard or to scan the purchase. Do not use it when asked fi specific items are available. It captures an image and will return a list of detected groceries in the image. Read the number and each product separately."""
-    return process()
+class DetectGroceriesToolArgs(BaseModel):
+    detail: Optional[Literal["low", "high"]] = Field(
+        default=None,
+        description=("Only pass \"low\" for a quick overview when exact counts do not matter, otherwise leave it empty.")
+    )
 
-# Function to encode the image
-def encode_image(image_path):
-  with open(image_path, "rb") as image_file:
-    return base64.b64encode(image_file.read()).decode('utf-8')
+@tool("detect_groceries", args_schema=DetectGroceriesToolArgs)
+def detect_groceries_tool(detail=None):
+    """Use this tool when asked to scan the cupboard or to scan the purchase. Do not use it when asked fi specific items are available. It captures an image and will return a list of detected groceries in the image. Read the number and each product separately."""
+    return process(detail or VISION_DETAIL)
 
-def process():
-    # Replace this URL with the actual URL of your ESP32 camera server
-    url = 'http://10.42.0.64/capture'
-    # Path to your image
-    image_path = "./pictures/captured_image.jpg"
+def process(detail=VISION_DETAIL):
     dotenv.load_dotenv()
 
     # OpenAI API Key
     api_key = os.getenv('OPENAI_API_KEY')
-    # Sending a GET request to the ESP32-CAM and saving the response
-    response = requests.get(url)
-
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Open a file in binary write mode and save the image
-        if os.path.exists(image_path):
-            # Remove the file
-            os.remove(image_path)
-            print(f"The file {image_path} has been deleted.")
-        with open(image_path, 'wb') as f:
-            f.write(response.content)
-        print("Image saved successfully.")
-    else:
-        print("Failed to retrieve the image.")
-
-    # Getting the base64 string
-    base64_image = encode_image(image_path)
+    # The frame stays in memory: captured, checked for completeness and scaled down to what the model looks at
+    try:
+        frame = capture_frame()
+        image = prepare_image(frame, VISION_LOW_DETAIL_SIDE if detail == "low" else VISION_MAX_SIDE)
+    except requests.exceptions.RequestException as e:
+        return f"The camera could not be reached: {e}"
+    except CaptureError as e:
+        return f"Failed to retrieve the image. {e}"
+    print(f"Image captured: {len(frame)} bytes, {len(image)} bytes sent.")
 
     headers = {
     "Content-Type": "application/json",
@@ -61,7 +53,8 @@ def process():
             {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/jpeg;base64,{base64_image}"
+                "url": image_data_url(image),
+                "detail": detail
             }
             }
         ]
@@ -70,7 +63,7 @@ def process():
     "max_tokens": 300
     }
 
-    response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+    response = get_http_client().post(f"{OPENAI_API_URL}/chat/completions", headers=headers, json=payload)
 
     # print(response.choices[0].message.content)
-    return response.json()["choices"][0]["message"]["content"]
\ No newline at end of file
+    return response.json()["choices"][0]["message"]["content"]
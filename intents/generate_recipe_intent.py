@@ -6,6 +6,10 @@ import json
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
+from utils.http_client import get_http_client
+from utils.backend_replica import get_backend_replica
+from utils.constants import OPENAI_API_URL
+
 
 @tool("generate_recipe")
 def generate_recipe_tool(query):
@@ -13,16 +17,9 @@ def generate_recipe_tool(query):
     return generate_recipe()
 
 def fetch_inventory():
-    """Fetches all available ingredients from the storage API."""
-    inventory_url = "http://130.149.154.54:3000/storage"
-    
+    """Fetches all available ingredients from the local replica of the storage API."""
     try:
-        response = requests.get(inventory_url)
-        if response.status_code != 200:
-            return None
-
-        inventory_data = response.json().get("data", [])
-        return inventory_data
+        return get_backend_replica().storage.items()
 
     except Exception as e:
         print(f"Error fetching inventory: {str(e)}")
@@ -65,7 +62,7 @@ def generate_recipe():
     }
 
     try:
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+        response = get_http_client().post(f"{OPENAI_API_URL}/chat/completions", headers=headers, json=payload)
 
         if response.status_code != 200:
             return f"Error: Failed to generate recipe. Server returned status code {response.status_code}."
@@ -2,29 +2,55 @@ from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 import requests
 from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
 
-BASE_URL = "http://130.149.154.54"
+from utils.http_client import get_http_client
+from utils.product_index import get_product_index, split_products
+from utils.constants import STORAGE_API_URL
 
 class AvailabilityArgs(BaseModel):
-    query: str = Field(
+    products: list[str] = Field(
         description=(
-            "Extract ONLY the product name from the user's request.\n"
-            "Return the name in english as plain text with no quotes and no extra words. Always use the singular form of the word."
+            "The names of ALL products the user asks about, one entry per product, e.g. [\"eggs\", \"milk\", \"flour\"].\n"
+            "Pass the names as the user said them, in any language, singular or plural, with no extra words."
         )
     )
 
 @tool("check_product_availability", args_schema=AvailabilityArgs)
-def check_product_availability_tool(query: str):
-    """Use this tool when asked for the availability of a product. Returns a short status."""
-    return check_availability(query)
+def check_product_availability_tool(products: list[str]):
+    """Use this tool when asked for the availability of one or more products. Returns a short status per product."""
+    return check_products(products)
+
+def check_products(products: list[str]) -> str:
+    """
+    Resolves every product against the local product index (German or English, singular or plural, fuzzy),
+    so names missing from the inventory are answered without a request, and checks the others concurrently.
+    """
+    queries = [name for product in products for name in split_products(product)]
+    if not queries:
+        return "Missing product name."
+    index = get_product_index()
+    try:
+        resolved = [index.resolve(query) for query in queries]
+    except requests.RequestException:
+        # Without the replica every name goes to the server as given
+        resolved = [query.strip() for query in queries]
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        results = list(executor.map(_check_resolved, queries, resolved))
+    return "\n".join(results)
+
+def _check_resolved(query: str, name: str | None) -> str:
+    if name is None:
+        return f"{query.strip()}: not in the inventory."
+    return check_availability(name)
 
 def check_availability(name: str) -> str:
     name = name.strip()
     if not name:
         return "Missing product name."
-    url = f"{BASE_URL}/api/storage/available/{quote_plus(name)}"
+    url = f"{STORAGE_API_URL}/storage/available/{quote_plus(name)}"
     try:
-        r = requests.get(url, timeout=5)
+        r = get_http_client().get(url)
     except requests.RequestException as e:
         return f"{name}: network error ({e.__class__.__name__})."
     if r.status_code == 404:
@@ -1,11 +1,12 @@
 import requests
-import dotenv
-import os
 from datetime import datetime, timedelta
 import re
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
+from utils.forecast_cache import get_forecast_cache
+from utils.constants import WEATHER_CITY
+
 class GetTemperatureToolArgs(BaseModel):
     day: str = Field(
         description=(
@@ -23,17 +24,6 @@ def get_temperature_tool(day):
     return get_temperature(day)
 
 def get_temperature(day):
-    dotenv.load_dotenv()
-    api_key = os.environ.get('OPEN_WEATHER_API')
-
-    # Specify the city and country code (e.g., London,GB for London, United Kingdom)
-    city = 'Berlin'
-    country_code = 'DE'
-
-    # Make a request to the OpenWeatherMap API forecast endpoint
-    url = f'http://api.openweathermap.org/data/2.5/forecast?q={city},{country_code}&appid={api_key}'
-    response = requests.get(url)
-
     day = day.lower()
     day = day.replace("next ", "")
     date_pattern_no_year = r'\d{2}\.\d{2}'
@@ -72,48 +62,20 @@ def get_temperature(day):
     else:
         return "The requested day is none of the next 5 days or has the wrong input format, I can only give information about the next 5 days."
     print(specified_date)
-   # Check if the request was successful (status code 200)
-    if response.status_code == 200:
-        data = response.json()
-
-        # Initialize variables to store weather information
-        max_temperature = None
-        description = None
-        total_rain_percentage = 0
-        count_entries = 0
-
-        for entry in data['list']:
-            date_time = entry['dt_txt']
-            date = date_time.split()[0]  # Extract date from date_time
-
-            # Check if the entry is for tomorrow
-            if date == specified_date:
-                max_temperature_kelvin = entry['main']['temp_max']  # Use 'temp_max' for max temperature
-                max_temperature_celsius = max_temperature_kelvin - 273.15  # Convert to Celsius
-                description = entry['weather'][0]['description']
-                rain_percentage = entry.get('pop', 0) * 100  # Probability of Precipitation
-
-                # Update max temperature if necessary
-                if max_temperature is None or max_temperature_celsius > max_temperature:
-                    max_temperature = max_temperature_celsius
-                
-                total_rain_percentage += rain_percentage
-                count_entries += 1
-
-            # Calculate average rain percentage
-            if count_entries > 0:
-                avg_rain_percentage = total_rain_percentage / count_entries
-            else:
-                avg_rain_percentage = 0
-
-        # Generate the descriptive sentence
-        if max_temperature is not None and description is not None:
-            weather_description = f"On {day_of_week} it will be maximum {max_temperature:.2f} degrees, {description}, with an average {avg_rain_percentage:.0f}% chance of precipitation in Berlin."
-            return weather_description
-        else:
-            return "Unable to retrieve weather forecast from json object, maybe the date is too far ahead in the future."
+    # The forecast is cached and already reduced to one summary per day
+    try:
+        summaries = get_forecast_cache().get(WEATHER_CITY)
+    except requests.exceptions.HTTPError as e:
+        return f"Error: Unable to retrieve data. Status code {e.response.status_code}"
+    except requests.exceptions.RequestException as e:
+        return f"Error: Unable to retrieve data: {e}"
+
+    summary = summaries.get(specified_date)
+    if summary is not None:
+        weather_description = f"On {day_of_week} it will be maximum {summary.max_temperature:.2f} degrees, {summary.description}, with an average {summary.rain_percentage:.0f}% chance of precipitation in {WEATHER_CITY.split(',')[0]}."
+        return weather_description
     else:
-        return f"Error: Unable to retrieve data. Status code {response.status_code}"
+        return "Unable to retrieve weather forecast from json object, maybe the date is too far ahead in the future."
     
 
 def get_day_difference(target_weekday):
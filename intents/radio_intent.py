@@ -1,41 +1,28 @@
-import yaml
-import text2numde
-from fuzzywuzzy import fuzz
-import os
-import re
 from loguru import logger
 import random
 
+from utils.station_index import get_station_index
+
 
 def start_radio(audioplayer, volume, language, name):
-    config_path = os.path.join("./intents/config_start_radio.yaml")
-    with open(config_path, "r", encoding="utf-8") as file:
-        config_file = yaml.load(file, Loader=yaml.FullLoader)
+    station_index = get_station_index()
 
     # if no slot has been detected, play a random radio stream (see start_radio_dataset.yaml)
     if name == None or name == "":
-        return random.choice(config_file['intent']['start_radio']['radio_station'])
-
-    # convert text numbers to real numbers
-    radio_station = text2numde.sentence2num(name)
-    # eliminate unnecessary spaces
-    radio_station = re.sub(' +', ' ', radio_station)
+        name = random.choice(list(station_index.stations()))
+        logger.info("No radio station requested, playing {}", name)
 
-    for name, URL in config_file['intent']['start_radio']['radio_station'].items():
-        ratio = fuzz.ratio(radio_station.lower(), name.lower())
-        logger.info("Übereinstimmung von {} und {} ist {}%", radio_station, name, ratio)
-        if ratio > 70:
-            audioplayer.set_volume(volume)
-            audioplayer.play_stream(URL)
-            return ""
+    station_name, URL = station_index.lookup(name, score_cutoff=70)
+    if station_name is not None:
+        audioplayer.set_volume(volume)
+        audioplayer.play_stream(URL)
+        return ""
 
-    for name, path in config_file['intent']['start_radio']['file_name'].items():
-        ratio = fuzz.ratio(radio_station.lower(), name.lower())
-        logger.info("Übereinstimmung von {} und {} ist {}%", radio_station, name, ratio)
-        if ratio > 70:
-            audioplayer.set_volume(volume)
-            audioplayer.play_file(path)
-            #player.play_file("Do I Wanna Know.wav")
-            return ""
+    file_name, path = station_index.lookup_file(name, score_cutoff=70)
+    if file_name is not None:
+        audioplayer.set_volume(volume)
+        audioplayer.play_file(path)
+        return ""
 
-    return random.choice(config_file['intent']['start_radio'][language]['unknown_name'])
\ No newline at end of file
+    replies = station_index.unknown_name_replies(language)
+    return random.choice(replies) if replies else f"I don't know the radio station {name}."
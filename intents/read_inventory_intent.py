@@ -2,28 +2,17 @@ import requests
 import json 
 from langchain_core.tools import tool
 
+from utils.backend_replica import get_backend_replica
+
 @tool("read_inventory")
 def read_inventory_tool():
     """This tool sends a GET request to a server to fetch and read inventory items."""
     return process()
 
 def process():
-    yolo_url = "http://130.149.154.54:3000/storage"
     try:
-        # Sende eine GET-Anfrage an den YOLO-Server
-        response = requests.get(yolo_url)
-        if response.status_code != 200:
-            return f"Failed to fetch inventory. Server returned status code {response.status_code}."
-
-        # Dekodiere die Antwort und parse das JSON
-        try:
-            raw_data = response.content  # Rohdaten (bytes)
-            json_data = json.loads(raw_data.decode('utf-8'))  # Dekodiere und parse
-        except Exception as e:
-            return f"Failed to parse JSON response: {str(e)}"
-
-        # Daten extrahieren
-        inventory = json_data.get("data", [])
+        # Lokale Kopie des YOLO-Servers, wird im Hintergrund aktualisiert
+        inventory = get_backend_replica().storage.items()
         if not inventory:
             text_to_read = "The inventory is empty."
         else:
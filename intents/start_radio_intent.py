@@ -1,14 +1,9 @@
-import yaml
-import text2numde
-from fuzzywuzzy import fuzz
-import os
-import re
-from loguru import logger
 import random
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
 import utils.global_variables as global_variables
+from utils.station_index import get_station_index
 
 
 class StartRadioToolArgs(BaseModel):
@@ -27,37 +22,24 @@ def start_radio(name):
     if global_variables.radio_player.is_playing():
         global_variables.radio_player.stop()
 
-    config_path = os.path.join("./intents/config_start_radio.yaml")
-    with open(config_path, "r", encoding="utf-8") as file:
-        config_file = yaml.load(file, Loader=yaml.FullLoader)
-    station_dict = config_file['intent']['start_radio']['radio_station']
+    station_index = get_station_index()
+    station_dict = station_index.stations()
 
-    station_name, URL = find_best_match(name, station_dict)
+    station_name, URL = station_index.lookup(name)
     if station_name != None:
         global_variables.radio_player.set_volume(1.0)
-        global_variables.radio_player.play_stream(URL)
-        return f"Playing the radio station {station_name}"
-
-    # if no slot has been detected, play a random radio stream (see config_start_radio.yaml)
-    station_name, URL = random.choice(list(station_dict.items()))
+        if global_variables.radio_player.play_stream(URL):
+            return f"Playing the radio station {station_name}"
+        return f"The radio station {station_name} is currently not reachable."
+
+    # if no slot has been detected, play a random radio stream (see config_start_radio.yaml), stations known to be down are tried last
+    station_names = list(station_dict)
+    random.shuffle(station_names)
+    station_cache = global_variables.radio_player.station_cache
+    urls = station_cache.order(list(dict.fromkeys(station_dict[name] for name in station_names)))
     global_variables.radio_player.set_volume(1.0)
-    global_variables.radio_player.play_stream(URL)
-    return f"Playing the radio station {station_name}."
-
-def find_best_match(query, station_dict):
-    # convert text numbers to real numbers
-    radio_station = text2numde.sentence2num(query)
-    # eliminate unnecessary spaces
-    radio_station = re.sub(' +', ' ', radio_station)
-
-    best_match = None
-    best_score = -1
-    
-    for station_name, _ in station_dict.items():
-        score = fuzz.ratio(radio_station.lower(), station_name.lower())
-        if score > best_score and score > 50:
-            logger.debug(f"Found radio station: {station_name} with a score of {score}")
-            best_match = station_name
-            best_score = score
-    
-    return (best_match, station_dict.get(best_match)) if best_match else (None, None)
\ No newline at end of file
+    for URL in urls:
+        if global_variables.radio_player.play_stream(URL):
+            station_name = next(name for name in station_names if station_dict[name] == URL)
+            return f"Playing the radio station {station_name}."
+    return "No radio station is reachable at the moment."
@@ -4,6 +4,9 @@ import subprocess
 from pydantic import Field, BaseModel
 from langchain_core.tools import tool
 
+from utils.http_client import get_http_client
+from utils.constants import ESP32_RELAY_URL
+
 SHELF_MANIPULATION_PATH = "utils/shelf_manipulation.py" 
 
 class SwitchCabinetPositionToolArgs(BaseModel):
@@ -19,8 +22,8 @@ def switch_cabinet_position_tool(shelf_identifier):
 
 def switch_shelf_position(shelf_identifier):
 
-    # Replace with the IP address or hostname of your ESP32
-    esp32_url = "http://10.42.8.215"  # Use the mDNS hostname
+    # The address of the ESP32 is set in utils/constants.py
+    esp32_url = ESP32_RELAY_URL
 
     # Endpoint to switch the relay
     relay_endpoint_left_shelf = "/relay_left_shelf"
@@ -44,7 +47,7 @@ def switch_shelf_position(shelf_identifier):
 
 
 def activate_relay(url, shelf_identifier):
-    response = requests.get(url)
+    response = get_http_client().get(url)
     print(response.text)
     if response.status_code == 200:
         return f"Shelf {shelf_identifier} switched successfully"
@@ -9,7 +9,6 @@ import pvporcupine
 import subprocess
 from flask import Flask, request, jsonify
 import threading
-import struct
 import sys
 
 from intents import TOOLS
@@ -18,6 +17,16 @@ from utils import open_microphone, KEYWORD_PATH, MODEL_FILE_PATH, PIXEL_RING_PAT
 import utils.global_variables as global_variables
 from utils.spotify_management import Spotify
 from utils.radio_player import AudioPlayer
+from utils.pixel_ring import PixelRingController
+from utils.audio_devices import get_device_manager
+from utils.audio_convert import AudioConverter, Reblocker
+from utils.constants import DEVICE_RETRY_INTERVAL, RESPEAKER_POLL_INTERVAL, MUSIC_DUCK_GAIN, WEATHER_CITY
+from utils.respeaker import TuningService
+from utils.earcons import EarconBank
+from utils.station_index import get_station_index
+from utils.backend_replica import get_backend_replica
+from utils.write_behind import get_write_behind_queue
+from utils.forecast_cache import get_forecast_cache
 
 sys.stdout.reconfigure(encoding='utf-8', errors='backslashreplace')
 
@@ -31,15 +40,18 @@ class VoiceAssistant():
         self.select_microphone()
         self.initialize_spotify()
         self.initialize_wakeword_detection()
+        self.initialize_speaker()
+        self.initialize_earcons()
         self.initialize_music_stream()
+        self.initialize_backend_replica()
         self.initialize_pixel_ring()
+        self.initialize_respeaker()
         self.initialize_touch_sensor_server()
         self.initialize_agent()
-        self.initialize_speaker()
         logger.debug("Initialization completed.")
 
     def select_microphone(self):
-        self.pyAudio = pyaudio.PyAudio()
+        self.audio_devices = get_device_manager()
         parser = argparse.ArgumentParser(description='Select microphone.')
         parser.add_argument('-m', '--microphone', type=int, help='Index of the microphone to use')
         args = parser.parse_args()
@@ -51,16 +63,15 @@ class VoiceAssistant():
 
             # Print available microphones
             print("\nList of available microphones:\n")
-            for i in range(self.pyAudio.get_device_count()):
-                device_info = self.pyAudio.get_device_info_by_index(i)
+            for i, device_info in enumerate(self.audio_devices.devices()):
                 print(f"Device {i}: {device_info['name']} (Sample Rate: {device_info['defaultSampleRate']} Hz, Channels: {device_info['maxInputChannels']})")
 
             # Ask user to select a microphone
             while self.microphone_index is None:
                 try:
                     self.microphone_index = int(input("\nEnter the index of the microphone you want to use: "))
-                    if not (0 <= self.microphone_index < self.pyAudio.get_device_count()):
-                        print(f"Invalid microphone index. Please select an index between 0 and {self.pyAudio.get_device_count()}.")
+                    if not (0 <= self.microphone_index < self.audio_devices.device_count()):
+                        print(f"Invalid microphone index. Please select an index between 0 and {self.audio_devices.device_count()}.")
                         self.microphone_index = None
                 except ValueError:
                     print("Invalid input format. Please enter a valid microphone index as an integer.")
@@ -76,19 +87,48 @@ class VoiceAssistant():
 
         PICOVOICE_KEY = os.environ.get('PICOVOICE_KEY')
         self.porc = pvporcupine.create(access_key=PICOVOICE_KEY, keyword_paths=[KEYWORD_PATH], model_path=MODEL_FILE_PATH)
-        self.audio_stream = self.pyAudio.open(rate = self.porc.sample_rate, channels=1, format = pyaudio.paInt16, input=True, frames_per_buffer=self.porc.frame_length, input_device_index= self.microphone_index)
+        self.open_wakeword_stream()
+
+    def open_wakeword_stream(self):
+        # Record at the microphone's native rate and convert to the rate Porcupine expects
+        device_rate = self.audio_devices.default_rate(self.microphone_index)
+        self.wakeword_read_size = self.porc.frame_length * device_rate // self.porc.sample_rate
+        self.wakeword_converter = AudioConverter(device_rate, self.porc.sample_rate)
+        self.wakeword_frames = Reblocker(self.porc.frame_length, dtype="int16")
+        self.audio_stream = self.audio_devices.open_stream(rate = device_rate, channels=1, format = pyaudio.paInt16, input=True, frames_per_buffer=self.wakeword_read_size, input_device_index= self.microphone_index)
     
     def initialize_music_stream(self):
-        global_variables.radio_player = AudioPlayer(volume=1.0)
+        # The radio is mixed into the speaker's output, so it keeps playing (ducked) while Luna speaks
+        global_variables.radio_player = AudioPlayer(volume=1.0, speaker=self.speaker)
+        # Keep the format and health of the configured stations up to date in the background
+        global_variables.radio_player.station_cache.start(list(get_station_index().stations().values()))
+
+    def initialize_backend_replica(self):
+        # Inventory and shopping list tools answer from a local copy of the storage server,
+        # additions are queued on disk and sent in the background
+        get_backend_replica().start()
+        get_write_behind_queue().start()
+        # Weather questions are answered from a forecast that is kept fresh in the background
+        get_forecast_cache().start([WEATHER_CITY])
 
     def initialize_pixel_ring(self):
         # Start the subprocess
         command = ["python", PIXEL_RING_PATH, "initialize_pixel_ring"]
         subprocess.run(command)
+        global_variables.pixel_ring = PixelRingController(PIXEL_RING_PATH)
+
+    def initialize_respeaker(self):
+        global_variables.respeaker = TuningService(poll_interval=RESPEAKER_POLL_INTERVAL)
+        if not global_variables.respeaker.start():
+            global_variables.respeaker = None
 
     def initialize_speaker(self):
         self.speaker = Speaker()
 
+    def initialize_earcons(self):
+        # Decoded once, played from memory for immediate feedback on wake and during slow tools
+        self.earcons = EarconBank()
+
     def initialize_agent(self):
         self.agent = OpenAIVoiceReactAgent(
         instructions=SYSTEM_PROMPT,
@@ -123,25 +163,42 @@ class VoiceAssistant():
     async def recognize_speech(self, mic_stream):
         start_time = time.time()  # Start time for overall process        
         # Activate LEDs
-        subprocess.run(["python", PIXEL_RING_PATH, "activate_doa"])
-
-        # Mute other devices while listening
-        if global_variables.radio_player.is_playing():
-            logger.debug(f"Stopped the radio player.")
-            global_variables.radio_player.stop()
-        if global_variables.spotify.is_spotify_playing():
-            logger.debug(f"Set spotify volume to mute volume: {0.0}")
-            global_variables.spotify.stop()
+        global_variables.pixel_ring.set_mode("activate_doa")
+
+        # Duck the music while listening and speaking, it is faded back in when the session ends.
+        # Spotify is only called if the tracked state says it plays, and in parallel to the connection setup.
+        self.speaker.duck()
+        spotify_duck = None
+        if global_variables.spotify is not None and global_variables.spotify.is_spotify_playing():
+            logger.debug("Ducking the spotify volume to {} of its level.", MUSIC_DUCK_GAIN)
+            spotify_duck = asyncio.create_task(asyncio.to_thread(global_variables.spotify.duck, MUSIC_DUCK_GAIN))
         
-        await self.agent.aconnect(
-            input_stream=mic_stream, 
-            send_output_chunk=lambda chunk: output_audio_chunk(chunk, self.speaker),
-            system_start_time=start_time,
-            speaker=self.speaker,
-        )
+        try:
+            await self.agent.aconnect(
+                input_stream=mic_stream, 
+                send_output_chunk=lambda chunk: output_audio_chunk(chunk, self.speaker),
+                system_start_time=start_time,
+                speaker=self.speaker,
+                earcons=self.earcons,
+            )
+        finally:
+            self.speaker.duck(False)
+            if spotify_duck is not None:
+                try:
+                    await spotify_duck
+                except Exception as e:
+                    logger.warning("Ducking the spotify volume failed: {}", e)
+                if global_variables.spotify is not None:
+                    try:
+                        await asyncio.to_thread(global_variables.spotify.unduck)
+                    except Exception as e:
+                        logger.warning("Restoring the spotify volume failed: {}", e)
 
         end_time = time.time()
         overall_duration = end_time - start_time
+        logger.debug("Audio queues: microphone {}, speaker {}", mic_stream.stats.snapshot(), self.speaker.stats.snapshot())
+        if global_variables.radio_player.is_playing():
+            logger.debug("Radio buffer: {}", global_variables.radio_player.buffer_health())
 
         # Logging times to a file
         with open("./logs/durations_log.txt", "a") as file:
@@ -162,25 +219,47 @@ class VoiceAssistant():
             touch_sensor_thread.start()
 
             while True:
-                pcm = self.audio_stream.read(self.porc.frame_length)
-                pcm_unpacked =  struct.unpack_from("h" * self.porc.frame_length, pcm)
-                keyword_index = self.porc.process(pcm_unpacked)
+                try:
+                    pcm = self.audio_stream.read(self.wakeword_read_size)
+                except OSError as e:
+                    # Device error, e.g. the microphone was unplugged: reinitialize PortAudio and reopen
+                    logger.warning("Wake word stream failed ({}), reopening the microphone.", e)
+                    generation = self.audio_devices.stream_generation(self.audio_stream)
+                    self.audio_devices.discard(self.audio_stream)
+                    self.audio_devices.recover(generation)
+                    while True:
+                        time.sleep(DEVICE_RETRY_INTERVAL)
+                        try:
+                            self.open_wakeword_stream()
+                            break
+                        except (OSError, IndexError) as e:   # IndexError: the device is missing from the list
+                            logger.warning("Microphone still not available ({}), retrying.", e)
+                            self.audio_devices.recover()
+                    continue
+                self.wakeword_frames.push(self.wakeword_converter.convert(pcm))
+                keyword_index = -1
+                while (frame := self.wakeword_frames.pop()) is not None:
+                    keyword_index = max(keyword_index, self.porc.process(frame[:, 0]))
                 with self.lock:
                     trigger_speech = self.start_speech_recognition
                 if keyword_index >= 0 or trigger_speech: # -1, if no keyword was detected
                     if keyword_index >= 0:
                         logger.info("Wakeword '{}' detected. How can I help you?", self.wakewords[keyword_index])
+                        if global_variables.respeaker is not None:
+                            logger.debug("Voice direction: {} degrees", global_variables.respeaker.direction)
                     else:
                         logger.info("Voice assistant triggered by touch event.")
 
                     async with open_microphone() as mic_stream:
-                        subprocess.run(["python", PIXEL_RING_PATH, "activate_doa"])
+                        global_variables.pixel_ring.set_mode("activate_doa")
+                        await self.earcons.play(self.speaker, "wake")
                         logger.info("Websocket starting...")
                         await self.recognize_speech(mic_stream)
                         logger.info("Websocket terminated...")
 
                     # Reset variables
                     keyword_index = -1
+                    self.wakeword_frames.clear()
                     with self.lock:
                         self.start_speech_recognition = False
             
@@ -193,13 +272,24 @@ class VoiceAssistant():
             if self.porc:
                 self.porc.delete()
             if self.audio_stream is not None:
-                self.audio_stream.close()
+                self.audio_devices.discard(self.audio_stream)
             if global_variables.radio_player is not None:
                 global_variables.radio_player.stop()
+                global_variables.radio_player.station_cache.stop()
             self.speaker.close()
+            get_write_behind_queue().stop()
+            get_forecast_cache().stop()
+            get_backend_replica().stop()
+            if global_variables.spotify is not None:
+                global_variables.spotify.close()
+            self.audio_devices.terminate()
+            if global_variables.respeaker is not None:
+                global_variables.respeaker.stop()
 
             # Turn off LEDs
-            subprocess.run(["python", PIXEL_RING_PATH, "turn_off"])
+            if global_variables.pixel_ring is not None:
+                global_variables.pixel_ring.set_mode("turn_off")
+                global_variables.pixel_ring.close()
 
 
 def run_voice_assistant():
@@ -1,16 +1,17 @@
-from tuning import Tuning
-import usb.core
-import usb.util
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.respeaker import TuningService
 import time
 
-dev = usb.core.find(idVendor=0x2886, idProduct=0x0018)
+service = TuningService(poll_interval=0.5)
 
-if dev:
-    Mic_tuning = Tuning(dev)
-    print(Mic_tuning.direction)
+if service.start():
+    service.subscribe(lambda state: print(state.direction))
+    print(service.direction)
     while True:
         try:
-            print(Mic_tuning.direction)
             time.sleep(1)
         except KeyboardInterrupt:
-            break
\ No newline at end of file
+            service.stop()
+            break
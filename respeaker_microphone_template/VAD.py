@@ -1,18 +1,24 @@
-from usb_4_mic_array.tuning import Tuning
-import usb.core
-import usb.util
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.respeaker import TuningService
 import time
 from loguru import logger
 
-def speech_activity_detection(threshhold):
-    counter = 0
-    dev = usb.core.find(idVendor=0x2886, idProduct=0x0018)
-    if dev:
-        Mic_tuning = Tuning(dev)
-        while True:
-            if Mic_tuning.is_voice() == 0:
-                counter += 1
-            if counter > threshhold:
-                logger.debug("Thread 2 zur Spracherkennung erfolgreich beendet.")
-                break
-            time.sleep(0.5)
\ No newline at end of file
+def speech_activity_detection(threshhold, service: TuningService | None = None, poll_interval=0.5):
+    """Wait until the speaker has been silent for threshhold polls of poll_interval seconds."""
+    # The tuning service polls the hardware VAD in the background, so this only reads its latest state
+    own_service = service is None
+    if own_service:
+        service = TuningService()
+        if not service.start():
+            return
+    # Silence counts from the call on, voice before it does not matter
+    since = time.monotonic()
+    try:
+        while service.silence_duration(since) < threshhold * poll_interval:
+            time.sleep(0.01)
+    finally:
+        if own_service:
+            service.stop()
+    logger.debug("Thread 2 zur Spracherkennung erfolgreich beendet.")
@@ -0,0 +1,46 @@
+import time
+import numpy as np
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.audio_convert import AudioConverter
+
+# Throughput of the conversions used by the audio paths. "cpu" is the share of one core needed
+# to keep up with real time. Run from the repo root:
+#   python tests/benchmark_audio_convert.py
+
+SECONDS = 10
+
+PATHS = [
+    # name, in_rate, out_rate, in_channels, out_channels, in_dtype, out_dtype, block frames
+    ("mic 48k -> 24k", 48000, 24000, 1, 1, "int16", "int16", 2048),
+    ("mic 16k -> 24k", 16000, 24000, 1, 1, "int16", "int16", 682),
+    ("wake word 48k -> 16k", 48000, 16000, 1, 1, "int16", "int16", 1536),
+    ("speaker 24k -> 48k", 24000, 48000, 1, 1, "int16", "int16", 2400),
+    ("radio 44.1k -> 48k stereo", 44100, 48000, 2, 2, "float32", "float32", 1024),
+    ("radio 48k stereo -> mono", 48000, 48000, 2, 1, "float32", "float32", 1024),
+]
+
+
+def run(name, in_rate, out_rate, in_channels, out_channels, in_dtype, out_dtype, block):
+    converter = AudioConverter(in_rate, out_rate, in_channels, out_channels, in_dtype, out_dtype)
+    t = np.arange(block * in_channels) / in_rate
+    samples = 0.5 * np.sin(2 * np.pi * 440 * t)
+    if in_dtype == "int16":
+        data = (samples * 32767).astype(np.int16).tobytes()
+    else:
+        data = samples.astype(np.float32).tobytes()
+
+    blocks = int(SECONDS * in_rate / block)
+    converter.convert(data)
+    start = time.perf_counter()
+    for _ in range(blocks):
+        converter.convert(data)
+    elapsed = time.perf_counter() - start
+    audio_seconds = blocks * block / in_rate
+    print(f"{name:<28} {audio_seconds / elapsed:8.0f}x real time   cpu {100 * elapsed / audio_seconds:6.2f} %   {elapsed / blocks * 1e6:8.1f} us/block")
+
+
+if __name__ == "__main__":
+    for path in PATHS:
+        run(*path)
@@ -0,0 +1,102 @@
+import io
+import json
+import statistics
+import threading
+import time
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image, ImageDraw
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.image_capture import capture_frame, prepare_image, image_data_url
+from utils.http_client import get_http_client
+
+# Payload size versus end-to-end time of the detect_groceries image path: capture from a stand-in
+# ESP32-CAM, scale and re-encode, base64 and upload to a stand-in vision endpoint. The endpoint
+# holds every request for the time its body needs on an UPLINK_MBIT uplink. Run from the repo root:
+#   python tests/benchmark_image_pipeline.py
+
+FRAME_SIZE = (1600, 1200)       # UXGA, the largest ESP32-CAM frame size
+FRAME_QUALITY = 90
+UPLINK_MBIT = 10
+RUNS = 20
+
+CONFIGS = [
+    # name, longer side (None: frame as captured), detail
+    ("full frame (before)", None, "high"),
+    ("1024 px, high detail", 1024, "high"),
+    ("768 px, high detail", 768, "high"),
+    ("512 px, low detail", 512, "low"),
+]
+
+
+def synthetic_frame():
+    """A cupboard-like test image: shelves, boxes and camera noise, so the JPEG compresses like a real frame."""
+    rng = np.random.default_rng(0)
+    image = Image.new("RGB", FRAME_SIZE, (200, 190, 170))
+    draw = ImageDraw.Draw(image)
+    for shelf in range(0, FRAME_SIZE[1], 300):
+        draw.rectangle((0, shelf + 280, FRAME_SIZE[0], shelf + 300), fill=(120, 90, 60))
+        x = 20
+        while x < FRAME_SIZE[0] - 100:
+            width, height = rng.integers(60, 200), rng.integers(120, 260)
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            draw.rectangle((x, shelf + 280 - height, x + width, shelf + 280), fill=color, outline=(0, 0, 0))
+            draw.text((x + 10, shelf + 290 - height), "LABEL", fill=(255, 255, 255))
+            x += width + rng.integers(10, 40)
+    pixels = np.asarray(image).astype(np.int16) + rng.normal(0, 6, (FRAME_SIZE[1], FRAME_SIZE[0], 3)).astype(np.int16)
+    output = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(output, format="JPEG", quality=FRAME_QUALITY)
+    return output.getvalue()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._send(self.server.frame, "image/jpeg")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(len(body) * 8 / (UPLINK_MBIT * 1e6))
+        self._send(json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode(), "application/json")
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(base_url, name, max_side, detail):
+    payload_bytes, prepare_times, totals = 0, [], []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        frame = capture_frame(f"{base_url}/capture")
+        prepare_start = time.perf_counter()
+        image = frame if max_side is None else prepare_image(frame, max_side)
+        prepare_times.append(time.perf_counter() - prepare_start)
+        payload = {"model": "gpt-4o", "messages": [{"role": "user", "content": [
+            {"type": "image_url", "image_url": {"url": image_data_url(image), "detail": detail}}]}]}
+        body = json.dumps(payload)
+        get_http_client().post(f"{base_url}/v1/chat/completions", data=body, headers={"Content-Type": "application/json"})
+        totals.append(time.perf_counter() - start)
+        payload_bytes = len(body)
+    print(f"{name:<24} payload {payload_bytes / 1024:7.0f} KiB   prepare {statistics.median(prepare_times) * 1000:6.1f} ms"
+          f"   end to end {statistics.median(totals) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.frame = synthetic_frame()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"frame {FRAME_SIZE[0]}x{FRAME_SIZE[1]}, {len(server.frame) / 1024:.0f} KiB, uplink {UPLINK_MBIT} Mbit/s, median of {RUNS} runs")
+    for config in CONFIGS:
+        run(base_url, *config)
+    server.shutdown()
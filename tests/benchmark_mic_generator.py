@@ -0,0 +1,80 @@
+import asyncio
+import queue
+import threading
+import time
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.microphone import MicGenerator
+
+# Compares the per-chunk scheduling overhead of the old asyncio.to_thread(queue.get) read path
+# with the call_soon_threadsafe hand-off used by MicGenerator. Run from the repo root:
+#   python tests/benchmark_mic_generator.py
+
+NUM_CHUNKS = 2000
+CHUNK_INTERVAL = 0.001  # faster than the real 23 chunks/s to get stable numbers
+
+
+def producer(push, stop_event):
+    for _ in range(NUM_CHUNKS):
+        if stop_event.is_set():
+            break
+        push(time.perf_counter())
+        time.sleep(CHUNK_INTERVAL)
+
+
+class ToThreadGenerator:
+    """The previous implementation: one thread pool dispatch per chunk."""
+    def __init__(self, audio_queue):
+        self.audio_queue = audio_queue
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await asyncio.to_thread(self.audio_queue.get)
+
+
+async def measure(name, generator, push, stop_event):
+    thread = threading.Thread(target=producer, args=(push, stop_event), daemon=True)
+    delays = []
+    cpu_start = time.process_time()
+    thread.start()
+    async for sent_at in generator:
+        delays.append(time.perf_counter() - sent_at)
+        if len(delays) == NUM_CHUNKS:
+            break
+    cpu = time.process_time() - cpu_start
+    stop_event.set()
+    thread.join()
+
+    delays.sort()
+    mean_us = sum(delays) / len(delays) * 1e6
+    p99_us = delays[int(len(delays) * 0.99)] * 1e6
+    print(f"{name:<22} mean {mean_us:8.1f} us   p99 {p99_us:8.1f} us   cpu {cpu * 1e6 / NUM_CHUNKS:8.1f} us/chunk")
+
+
+async def main():
+    audio_queue = queue.Queue()
+    await measure("asyncio.to_thread", ToThreadGenerator(audio_queue), audio_queue.put, threading.Event())
+
+    stop_event = threading.Event()
+    mic_gen = MicGenerator(asyncio.get_running_loop(), stop_event, maxsize=NUM_CHUNKS)
+    await measure("call_soon_threadsafe", mic_gen, mic_gen.push, stop_event)
+
+    # Stop latency: how long a pending __anext__ takes to notice stop()
+    stop_event = threading.Event()
+    mic_gen = MicGenerator(asyncio.get_running_loop(), stop_event)
+    pending = asyncio.ensure_future(mic_gen.__anext__())
+    await asyncio.sleep(0.01)
+    stopped_at = time.perf_counter()
+    mic_gen.stop()
+    try:
+        await pending
+    except StopAsyncIteration:
+        pass
+    print(f"stop() -> StopAsyncIteration: {(time.perf_counter() - stopped_at) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+import multiprocessing
+import time
+import numpy as np
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.ring_buffer import SharedRingBuffer
+
+# Chunk rate of the old multiprocessing.Queue transport to the Speaker process versus the
+# shared-memory ring buffer, without an audio device. Run from the repo root:
+#   python tests/benchmark_speaker_transport.py
+
+NUM_CHUNKS = 20000
+CHUNK_BYTES = 4800          # 100 ms of 24 kHz int16 mono, a typical response.audio.delta
+RING_BYTES = 2 ** 20
+
+
+def queue_consumer(audio_queue, done):
+    received = 0
+    while True:
+        chunk = audio_queue.get()
+        if chunk is None:
+            break
+        received += len(chunk)
+    done.value = received
+
+
+def ring_consumer(ring, done):
+    received = 0
+    period = np.empty(CHUNK_BYTES, dtype=np.uint8)
+    while True:
+        count = ring.read_into(period)
+        if count:
+            received += count
+        elif ring.closed:
+            break
+        else:
+            ring.wait(0.1)
+    ring.release()
+    done.value = received
+
+
+def report(name, elapsed, cpu):
+    print(f"{name:<26} {NUM_CHUNKS / elapsed:10.0f} chunks/s   producer cpu {cpu / NUM_CHUNKS * 1e6:6.1f} us/chunk")
+
+
+def bench_queue(chunk):
+    audio_queue = multiprocessing.Queue(maxsize=64)
+    done = multiprocessing.Value('q', 0)
+    process = multiprocessing.Process(target=queue_consumer, args=(audio_queue, done))
+    process.start()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(NUM_CHUNKS):
+        audio_queue.put(chunk)
+    audio_queue.put(None)
+    process.join()
+    report("multiprocessing.Queue", time.perf_counter() - start, time.process_time() - cpu_start)
+    assert done.value == NUM_CHUNKS * CHUNK_BYTES
+
+
+def bench_ring(chunk):
+    ring = SharedRingBuffer(RING_BYTES)
+    done = multiprocessing.Value('q', 0)
+    process = multiprocessing.Process(target=ring_consumer, args=(ring, done))
+    process.start()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(NUM_CHUNKS):
+        data = memoryview(chunk)
+        while data:
+            written = ring.write(data)
+            if not written:
+                time.sleep(0.001)   # ring is full, like Speaker.play_chunk() waiting for the worker
+            data = data[written:]
+    ring.close()
+    process.join()
+    ring.release()
+    ring.unlink()
+    report("SharedRingBuffer", time.perf_counter() - start, time.process_time() - cpu_start)
+    assert done.value == NUM_CHUNKS * CHUNK_BYTES
+
+    # Flush of a full ring, as used when the reply is interrupted
+    ring = SharedRingBuffer(RING_BYTES)
+    while ring.write(chunk):
+        pass
+    start = time.perf_counter()
+    ring.flush()
+    skipped = ring.discard_flushed()
+    print(f"flush of {skipped} buffered bytes: {(time.perf_counter() - start) * 1e6:.1f} us")
+    ring.release()
+    ring.unlink()
+
+
+if __name__ == "__main__":
+    chunk = bytes(CHUNK_BYTES)
+    bench_queue(chunk)
+    bench_ring(chunk)
@@ -1,27 +1,29 @@
 import pyaudio
 import wave
 import numpy as np
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.audio_devices import get_device_manager
 
 microphone_index = 1
 
 def print_available_microphones():
-    audio = pyaudio.PyAudio()
+    devices = get_device_manager()
     print("Available microphones:")
-    for i in range(audio.get_device_count()):
-        device_info = audio.get_device_info_by_index(i)
+    for i, device_info in enumerate(devices.devices()):
         print(f"Device {i}: {device_info['name']} (Sample Rate: {device_info['defaultSampleRate']} Hz, Channels: {device_info['maxInputChannels']})")
-    audio.terminate()
 
 def record_audio(file_name, duration=6, sample_rate=44100, channels=2, chunk=1024):
-    audio = pyaudio.PyAudio()
+    devices = get_device_manager()
 
     # Set up the audio stream
-    stream = audio.open(format=pyaudio.paInt16,
-                        channels=channels,
-                        rate=sample_rate,
-                        input=True,
-                        input_device_index=microphone_index,
-                        frames_per_buffer=chunk)
+    stream = devices.open_stream(format=pyaudio.paInt16,
+                                 channels=channels,
+                                 rate=sample_rate,
+                                 input=True,
+                                 input_device_index=microphone_index,
+                                 frames_per_buffer=chunk)
 
     print("Recording...")
 
@@ -32,15 +34,13 @@ def record_audio(file_name, duration=6, sample_rate=44100, channels=2, chunk=102
 
     print("Finished recording.")
 
-    # Stop and close the audio stream
-    stream.stop_stream()
-    stream.close()
-    audio.terminate()
+    # Stop the audio stream and hand it back to the device manager
+    devices.release(stream)
 
     # Save the recorded audio to a WAV file
     wave_file = wave.open(file_name, 'wb')
     wave_file.setnchannels(channels)
-    wave_file.setsampwidth(audio.get_sample_size(pyaudio.paInt16))
+    wave_file.setsampwidth(devices.get_sample_size(pyaudio.paInt16))
     wave_file.setframerate(sample_rate)
     wave_file.writeframes(b''.join(frames))
     wave_file.close()
@@ -0,0 +1,126 @@
+import unittest
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.radio_player import AudioPlayer
+from utils.ring_buffer import SharedRingBuffer
+from utils.speaker import MusicControl, OUTPUT_SAMPLE_SIZE
+from utils.station_cache import StationCache
+
+# Streams an MP3 fixture from a local HTTP server through AudioPlayer, without an audio device.
+# The first connection is dropped mid-stream, the player has to reconnect and keep decoding.
+
+FIXTURE_SECONDS = 3
+DROP_AFTER_BYTES = 16000        # about one second of the 128 kbit/s fixture
+OUTPUT_RATE = 48000
+OUTPUT_CHANNELS = 2
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path != "/stream.mp3" or self.server.requests > self.server.max_requests:
+            self.send_error(404)
+            return
+        data = self.server.fixture
+        if self.server.requests == self.server.drop_request:
+            data = data[:DROP_AFTER_BYTES]
+        # No Content-Length: the end of the connection is the end of the stream, like a live radio station
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RingSpeaker:
+    """Stand-in for Speaker: provides the music ring and control block and drains the ring on a thread."""
+
+    def __init__(self):
+        self.output_rate = OUTPUT_RATE
+        self.output_channels = OUTPUT_CHANNELS
+        self.music_ring = SharedRingBuffer(2 ** 20)
+        self.music_control = MusicControl()
+        self.received = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        buffer = np.empty(2 ** 16, dtype=np.uint8)
+        while not self._stop.is_set():
+            self.music_ring.discard_flushed()
+            count = self.music_ring.read_into(buffer)
+            self.received += count
+            if not count:
+                self.music_ring.wait(0.05)
+
+    def seconds_received(self):
+        return self.received / (OUTPUT_RATE * OUTPUT_CHANNELS * OUTPUT_SAMPLE_SIZE)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.music_ring.release()
+        self.music_ring.unlink()
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class RadioStreamingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        fixture_path = os.path.join(self.directory, "fixture.mp3")
+        subprocess.run(["ffmpeg", "-loglevel", "quiet", "-f", "lavfi", "-i", f"sine=frequency=440:duration={FIXTURE_SECONDS}",
+                        "-ac", "2", "-ar", "44100", "-b:a", "128k", fixture_path], check=True)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        with open(fixture_path, "rb") as file:
+            self.server.fixture = file.read()
+        self.server.requests = 0
+        self.server.drop_request = 2    # the first request is the probe of the station cache
+        self.server.max_requests = 3    # the probe, the dropped connection and the reconnect
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/stream.mp3"
+
+        self.speaker = RingSpeaker()
+        cache = StationCache(os.path.join(self.directory, "station_cache.json"))
+        self.player = AudioPlayer(volume=1.0, speaker=self.speaker, station_cache=cache, prebuffer=0.5, max_reconnects=2)
+
+    def tearDown(self):
+        self.player.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.speaker.close()
+        shutil.rmtree(self.directory)
+
+    def test_reconnects_after_drop(self):
+        self.assertTrue(self.player.play_stream(self.url))
+        deadline = time.monotonic() + 30
+        while self.player.is_playing() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertFalse(self.player.is_playing())
+
+        health = self.player.buffer_health()
+        self.assertGreaterEqual(health["reconnects"], 1)
+        self.assertGreaterEqual(self.server.requests, 3)
+        # The dropped part plus the complete stream after the reconnect
+        self.assertGreater(self.speaker.seconds_received(), FIXTURE_SECONDS + 0.5)
+
+    def test_unreachable_station(self):
+        self.assertFalse(self.player.play_stream(self.url.replace("stream.mp3", "missing.mp3")))
+        self.assertFalse(self.player.is_playing())
+
+
+if __name__ == '__main__':
+    unittest.main()
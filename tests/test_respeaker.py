@@ -0,0 +1,84 @@
+import unittest
+import threading
+import time
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+from utils.respeaker import TuningService, SimulatedTuning
+sys.path.insert(1, os.path.join(parent, "respeaker_microphone_template"))
+from VAD import speech_activity_detection
+
+# Drives the tuning service and the VAD helper with SimulatedTuning, without the microphone array.
+
+POLL_INTERVAL = 0.01
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+    return condition()
+
+
+class TuningServiceTest(unittest.TestCase):
+
+    def start(self, samples):
+        service = TuningService(SimulatedTuning(samples), poll_interval=POLL_INTERVAL)
+        self.assertTrue(service.start())
+        self.addCleanup(service.stop)
+        return service
+
+    def test_publishes_direction_and_voice(self):
+        service = self.start([(270, True)])
+        self.assertTrue(wait_for(lambda: service.state.timestamp > 0))
+        self.assertEqual(service.direction, 270)
+        self.assertTrue(service.is_voice())
+        self.assertLess(service.silence_duration(), 0.5)
+
+    def test_notifies_subscribers_of_changes(self):
+        changes = []
+        event = threading.Event()
+        service = TuningService(SimulatedTuning([(0, False), (0, False), (90, True), (90, True)]), poll_interval=POLL_INTERVAL)
+        unsubscribe = service.subscribe(lambda state: (changes.append((state.direction, state.is_voice)), event.set()))
+        service.start()
+        self.addCleanup(service.stop)
+        self.assertTrue(event.wait(2.0))
+        unsubscribe()
+        self.assertIn((90, True), changes)
+
+    def test_silence_grows_without_voice(self):
+        service = self.start([(0, False)])
+        since = time.monotonic()
+        time.sleep(0.1)
+        self.assertGreaterEqual(service.silence_duration(since), 0.1)
+        # Silence before since does not count
+        self.assertLess(service.silence_duration(time.monotonic()), 0.05)
+
+
+class SpeechActivityDetectionTest(unittest.TestCase):
+
+    def test_waits_for_the_end_of_speech(self):
+        # Voice for about 0.3 s, then silence
+        service = TuningService(SimulatedTuning([(0, True)] * 30 + [(0, False)] * 1000), poll_interval=POLL_INTERVAL)
+        service.start()
+        self.addCleanup(service.stop)
+        self.assertTrue(wait_for(service.is_voice))
+        start = time.monotonic()
+        speech_activity_detection(5, service, poll_interval=0.02)
+        elapsed = time.monotonic() - start
+        self.assertFalse(service.is_voice())
+        self.assertGreaterEqual(service.silence_duration(), 0.1)
+        self.assertGreater(elapsed, 0.2)
+        self.assertLess(elapsed, 2.0)
+
+    def test_returns_after_silence_without_voice(self):
+        service = TuningService(SimulatedTuning([(0, False)]), poll_interval=POLL_INTERVAL)
+        service.start()
+        self.addCleanup(service.stop)
+        start = time.monotonic()
+        speech_activity_detection(5, service, poll_interval=0.02)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+from math import gcd
+import numpy as np
+
+# Sample format conversion and streaming sample rate conversion for all audio paths.
+# Every class works on preallocated buffers and returns views into them: consume (or copy) the
+# result before the next call.
+
+INT16_SCALE = 32768.0
+
+
+def int16_to_float32(data, out: np.ndarray | None = None) -> np.ndarray:
+    """Convert int16 PCM (bytes or array) to float32 in [-1, 1)."""
+    samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    if out is None:
+        out = np.empty(samples.shape, dtype=np.float32)
+    np.multiply(samples, 1.0 / INT16_SCALE, out=out, casting="unsafe")
+    return out
+
+
+def float32_to_int16(samples: np.ndarray, out: np.ndarray | None = None, scratch: np.ndarray | None = None) -> np.ndarray:
+    """Convert float32 samples to int16 PCM, clipping values outside [-1, 1]. scratch avoids a temporary array."""
+    if out is None:
+        out = np.empty(samples.shape, dtype=np.int16)
+    if scratch is None:
+        scratch = np.empty(samples.shape, dtype=np.float32)
+    np.multiply(samples, INT16_SCALE, out=scratch)
+    np.clip(scratch, -INT16_SCALE, INT16_SCALE - 1, out=scratch)
+    out[:] = scratch
+    return out
+
+
+def remix(samples: np.ndarray, channels: int, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Change the channel count of (frames, channels) float32 samples. Multichannel input is downmixed
+    to mono by averaging; mono is copied to every output channel.
+    """
+    frames, in_channels = samples.shape
+    if out is None:
+        out = np.empty((frames, channels), dtype=np.float32)
+    if in_channels == channels:
+        out[:] = samples
+    elif channels == 1:
+        np.mean(samples, axis=1, out=out[:, 0])
+    elif in_channels == 1:
+        out[:] = samples
+    else:
+        np.mean(samples, axis=1, out=out[:, 0])
+        out[:, 1:] = out[:, :1]
+    return out
+
+
+def design_lowpass(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    """
+    Windowed-sinc anti-aliasing filter for a rational rate change up/down, returned as a
+    (up, taps_per_phase) polyphase matrix with phases[p, k] = h[p + k * up].
+    """
+    length = up * taps_per_phase
+    cutoff = 0.5 / max(up, down) * 0.95   # cycles per sample at the upsampled rate, with a small guard band
+    n = np.arange(length) - (length - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(length)
+    h *= up / h.sum()
+    return np.ascontiguousarray(h.reshape(taps_per_phase, up).T, dtype=np.float32)
+
+
+class StreamingResampler:
+    """
+    Polyphase rate converter for continuous streams of (frames, channels) float32 blocks.
+    Filter history is kept between calls, so blocks can have any size and the output has no seams.
+    """
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1, taps_per_phase: int = 16, max_block: int = 4096):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // divisor
+        self.down = self.in_rate // divisor
+        self.channels = channels
+        self.taps = taps_per_phase
+        self.passthrough = self.up == self.down
+        self._phases = design_lowpass(self.up, self.down, taps_per_phase)
+        self._tap_offsets = np.arange(taps_per_phase)
+        self._position = 0      # upsampled index of the next output sample, relative to the current block
+        self._allocate(max_block)
+
+    def _allocate(self, max_block: int):
+        history = self.taps - 1
+        max_out = max_block * self.up // self.down + 2
+        self._max_block = max_block
+        self._input = np.zeros((history + max_block, self.channels), dtype=np.float32)
+        self._output = np.empty((max_out, self.channels), dtype=np.float32)
+        self._counter = np.arange(max_out)
+        self._upsampled = np.empty(max_out, dtype=np.int64)
+        self._index = np.empty(max_out, dtype=np.int64)
+        self._phase = np.empty(max_out, dtype=np.int64)
+        self._gather_index = np.empty((max_out, self.taps), dtype=np.int64)
+        self._gathered = np.empty((max_out, self.taps, self.channels), dtype=np.float32)
+        self._weights = np.empty((max_out, self.taps), dtype=np.float32)
+
+    def output_frames(self, in_frames: int) -> int:
+        """Number of frames the next process() call will return for in_frames input frames."""
+        if self.passthrough:
+            return in_frames
+        return max(0, -(-(in_frames * self.up - self._position) // self.down))
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+        frames = len(block)
+        if self.passthrough:
+            return block
+        if frames > self._max_block:
+            history = self._input[:self.taps - 1].copy()
+            self._allocate(frames)
+            self._input[:self.taps - 1] = history
+
+        history = self.taps - 1
+        self._input[history:history + frames] = block
+        count = self.output_frames(frames)
+
+        upsampled = self._upsampled[:count]
+        np.multiply(self._counter[:count], self.down, out=upsampled)
+        upsampled += self._position
+        index = self._index[:count]
+        phase = self._phase[:count]
+        np.floor_divide(upsampled, self.up, out=index)
+        np.remainder(upsampled, self.up, out=phase)
+
+        # y[n] = sum_k phases[p_n, k] * x[i_n - k]
+        index += history
+        gather_index = self._gather_index[:count]
+        np.subtract(index[:, None], self._tap_offsets[None, :], out=gather_index)
+        gathered = self._gathered[:count]
+        np.take(self._input, gather_index, axis=0, out=gathered)
+        weights = self._weights[:count]
+        np.take(self._phases, phase, axis=0, out=weights)
+        out = self._output[:count]
+        np.einsum("nkc,nk->nc", gathered, weights, out=out)
+
+        self._position += count * self.down - frames * self.up
+        self._input[:history] = self._input[frames:frames + history]
+        return out
+
+    def reset(self):
+        self._input[:] = 0
+        self._position = 0
+
+
+class AudioConverter:
+    """
+    Converts a stream between sample formats (int16 bytes / float32), channel counts and sample rates,
+    e.g. 48 kHz stereo from a device to the 24 kHz mono int16 the Realtime API expects.
+    """
+    def __init__(self, in_rate: int, out_rate: int, in_channels: int = 1, out_channels: int = 1,
+                 in_dtype: str = "int16", out_dtype: str = "int16", taps_per_phase: int = 16):
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.in_dtype = np.dtype(in_dtype)
+        self.out_dtype = np.dtype(out_dtype)
+        self.resampler = StreamingResampler(in_rate, out_rate, out_channels, taps_per_phase)
+        self._float = np.empty((0, in_channels), dtype=np.float32)
+        self._mixed = np.empty((0, out_channels), dtype=np.float32)
+        self._out = np.empty((0, out_channels), dtype=self.out_dtype)
+        self._scratch = np.empty((0, out_channels), dtype=np.float32)
+
+    @staticmethod
+    def _fit(buffer, frames):
+        if len(buffer) < frames:
+            buffer = np.empty((max(frames, 2 * len(buffer)), buffer.shape[1]), dtype=buffer.dtype)
+        return buffer
+
+    def convert(self, data) -> np.ndarray:
+        """Convert one block (bytes or array) and return a (frames, out_channels) view of the result."""
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(data, dtype=self.in_dtype)
+        else:
+            samples = np.asarray(data)
+        samples = samples.reshape(-1, self.in_channels)
+        frames = len(samples)
+
+        if self.in_dtype == np.int16:
+            self._float = self._fit(self._float, frames)
+            samples = int16_to_float32(samples, out=self._float[:frames])
+        if self.in_channels != self.out_channels:
+            self._mixed = self._fit(self._mixed, frames)
+            samples = remix(samples, self.out_channels, out=self._mixed[:frames])
+
+        resampled = self.resampler.process(samples)
+        if self.out_dtype == np.float32:
+            return resampled
+        frames = len(resampled)
+        self._out = self._fit(self._out, frames)
+        self._scratch = self._fit(self._scratch, frames)
+        return float32_to_int16(resampled, out=self._out[:frames], scratch=self._scratch[:frames])
+
+
+class Reblocker:
+    """
+    FIFO that turns a stream of variable-sized blocks (e.g. resampler output) into fixed-size blocks,
+    as needed by callback streams and the wake word engine.
+    """
+    def __init__(self, block_size: int, channels: int = 1, dtype="float32", capacity_blocks: int = 8):
+        self.block_size = block_size
+        self._buffer = np.zeros((block_size * capacity_blocks, channels), dtype=dtype)
+        self._frames = 0
+
+    def __len__(self):
+        return self._frames
+
+    def push(self, block: np.ndarray):
+        block = block.reshape(len(block), -1)
+        needed = self._frames + len(block)
+        if needed > len(self._buffer):
+            grown = np.zeros((2 * needed, self._buffer.shape[1]), dtype=self._buffer.dtype)
+            grown[:self._frames] = self._buffer[:self._frames]
+            self._buffer = grown
+        self._buffer[self._frames:needed] = block
+        self._frames = needed
+
+    def pop(self, partial: bool = False) -> np.ndarray | None:
+        """
+        Return the next full block as a copy, or None if not enough frames are buffered.
+        With partial=True, a remainder shorter than a block is returned zero-padded instead of None.
+        """
+        if self._frames < self.block_size:
+            if not partial or self._frames == 0:
+                return None
+            block = np.zeros((self.block_size, self._buffer.shape[1]), dtype=self._buffer.dtype)
+            block[:self._frames] = self._buffer[:self._frames]
+            self._frames = 0
+            return block
+        block = self._buffer[:self.block_size].copy()
+        self._frames -= self.block_size
+        self._buffer[:self._frames] = self._buffer[self.block_size:self.block_size + self._frames]
+        return block
+
+    def clear(self):
+        self._frames = 0
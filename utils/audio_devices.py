@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+import pyaudio
+from loguru import logger
+
+
+class AudioDeviceManager:
+    """
+    Process-wide owner of the PortAudio handle.
+    PortAudio is initialized once, device info is cached, and streams are pooled by format so that
+    reopening the microphone or speaker for the next session only costs a start_stream().
+    After a device error (e.g. the USB microphone was unplugged) call recover() to reinitialize PortAudio.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pa = None
+        self._devices = None
+        self._idle_streams = {}     # format key -> stopped stream ready for reuse
+        self._stream_keys = {}      # id(stream) -> (format key, generation)
+        self._active_streams = {}   # id(stream) -> stream handed out by open_stream() and not yet returned
+        self.generation = 0         # incremented on every PortAudio reinitialization
+
+    @property
+    def pa(self) -> pyaudio.PyAudio:
+        with self._lock:
+            if self._pa is None:
+                start_time = time.time()
+                self._pa = pyaudio.PyAudio()
+                logger.debug("PortAudio initialized in {:.3f} s.", time.time() - start_time)
+            return self._pa
+
+    def devices(self) -> list[dict]:
+        """Cached device info of all devices, as returned by get_device_info_by_index()."""
+        with self._lock:
+            if self._devices is None:
+                pa = self.pa
+                self._devices = [pa.get_device_info_by_index(i) for i in range(pa.get_device_count())]
+            return self._devices
+
+    def device_count(self) -> int:
+        return len(self.devices())
+
+    def device_info(self, index: int | None = None, output: bool = False) -> dict:
+        """Cached info of the given device, or of the default input/output device if index is None."""
+        if index is None:
+            with self._lock:
+                info = self.pa.get_default_output_device_info() if output else self.pa.get_default_input_device_info()
+            index = info["index"]
+        return self.devices()[index]
+
+    def default_rate(self, index: int | None = None, output: bool = False) -> int:
+        """Native sample rate of a device; streams opened at this rate avoid resampling in the host API."""
+        return int(self.device_info(index, output)["defaultSampleRate"])
+
+    def get_sample_size(self, format: int) -> int:
+        return pyaudio.get_sample_size(format)
+
+    def open_stream(self, *, rate: int, channels: int, format: int, input: bool = False, output: bool = False,
+                    frames_per_buffer: int = pyaudio.paFramesPerBufferUnspecified,
+                    input_device_index: int | None = None, output_device_index: int | None = None):
+        """
+        Return a started stream with the given format. A pooled stream is reused if one is available.
+        Streams must be handed back with release() (keep for reuse) or discard() (close).
+        """
+        key = (rate, channels, format, input, output, frames_per_buffer, input_device_index, output_device_index)
+        with self._lock:
+            stream = self._idle_streams.pop(key, None)
+            if stream is not None:
+                try:
+                    stream.start_stream()
+                except OSError as e:
+                    logger.warning("Pooled audio stream could not be restarted ({}), opening a new one.", e)
+                    self._close(stream)
+                    stream = None
+            if stream is None:
+                stream = self.pa.open(
+                    rate=rate,
+                    channels=channels,
+                    format=format,
+                    input=input,
+                    output=output,
+                    frames_per_buffer=frames_per_buffer,
+                    input_device_index=input_device_index,
+                    output_device_index=output_device_index,
+                )
+            self._stream_keys[id(stream)] = (key, self.generation)
+            self._active_streams[id(stream)] = stream
+            return stream
+
+    def release(self, stream):
+        """Stop the stream and keep it for the next open_stream() with the same format."""
+        with self._lock:
+            self._active_streams.pop(id(stream), None)
+            key, generation = self._stream_keys.get(id(stream), (None, None))
+            if key is None or generation != self.generation or key in self._idle_streams:
+                self._close(stream)
+                return
+            try:
+                stream.stop_stream()
+            except OSError:
+                self._close(stream)
+                return
+            self._idle_streams[key] = stream
+
+    def discard(self, stream):
+        """Close a stream instead of pooling it, e.g. after a read/write error."""
+        with self._lock:
+            self._close(stream)
+
+    def _close(self, stream):
+        self._stream_keys.pop(id(stream), None)
+        self._active_streams.pop(id(stream), None)
+        try:
+            stream.close()
+        except Exception:
+            pass
+
+    def recover(self, generation: int | None = None):
+        """
+        Reinitialize PortAudio and refresh the device list after a device error.
+        Pass the generation a failing stream was opened in, so concurrent callers only reinitialize once.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            logger.warning("Reinitializing PortAudio after an audio device error.")
+            self._shutdown()
+            self.generation += 1
+
+    def stream_generation(self, stream) -> int | None:
+        with self._lock:
+            return self._stream_keys.get(id(stream), (None, None))[1]
+
+    def _shutdown(self):
+        for stream in list(self._idle_streams.values()):
+            self._close(stream)
+        self._idle_streams.clear()
+        # Streams still in use (e.g. the wake word stream while the microphone thread recovers) must be closed
+        # before PortAudio is terminated. Their keys are kept, so their owners see a stale generation on the
+        # next read error and reopen without reinitializing PortAudio again.
+        for stream in self._active_streams.values():
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self._active_streams.clear()
+        if self._pa is not None:
+            self._pa.terminate()
+        self._pa = None
+        self._devices = None
+
+    def terminate(self):
+        with self._lock:
+            self._shutdown()
+
+
+_manager = None
+_manager_pid = None
+_manager_lock = threading.Lock()
+
+
+def get_device_manager() -> AudioDeviceManager:
+    """
+    Return the device manager of the current process. Child processes (e.g. the Speaker worker)
+    get their own instance, since a PortAudio handle must not be shared across a fork.
+    """
+    global _manager, _manager_pid
+    with _manager_lock:
+        if _manager is None or _manager_pid != os.getpid():
+            _manager = AudioDeviceManager()
+            _manager_pid = os.getpid()
+        return _manager
@@ -0,0 +1,196 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from loguru import logger
+
+from .http_client import get_http_client
+from .constants import STORAGE_SERVER_URL, REPLICA_SYNC_INTERVAL, REPLICA_MAX_STALENESS, HTTP_POOL_SIZE
+
+
+def extract_date_from_list_entry(list_entry):
+    """
+    Extracts only the date from a list entry.
+    Handles cases where 'List' is an integer.
+    Example:
+      Input: "0 - Tue Jan 21 2025"  → Output: "Tue Jan 21 2025"
+      Input: 0                      → Output: "" (Invalid)
+    """
+    if isinstance(list_entry, int):  # If 'List' is an integer, return an empty string
+        return ""
+
+    list_entry = str(list_entry)  # Ensure it's a string
+    parts = list_entry.split(" - ")  # Splitting by " - " to remove the ID prefix
+    return parts[1] if len(parts) > 1 else list_entry  # Returning only the date part
+
+
+class ReplicatedCollection:
+    """
+    In-memory copy of one collection of the storage server (e.g. /storage), indexed by the given key functions.
+    refresh() sends a conditional GET, so an unchanged collection costs one 304 response and no parsing.
+    A read that finds the copy older than max_staleness seconds refreshes it first.
+    """
+    def __init__(self, url: str, indexes: dict, max_staleness: float = REPLICA_MAX_STALENESS):
+        self.url = url
+        self.max_staleness = max_staleness
+        self._index_functions = indexes
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._items: list[dict] = []
+        self._indexes: dict[str, dict[str, list[dict]]] = {name: {} for name in indexes}
+        self._validators: dict[str, str] = {}
+        self.version = 0            # incremented whenever the items change, lets derived indexes know when to rebuild
+        self.overlay = None         # optional callable returning items that are not on the server yet, e.g. queued writes
+        self._view: list[dict] = []
+        self._synced_at = None      # time.monotonic() of the last successful refresh
+
+    def _build(self, items: list[dict]):
+        view = items + (self.overlay() if self.overlay is not None else [])
+        indexes = {name: {} for name in self._index_functions}
+        for item in view:
+            for name, key_of in self._index_functions.items():
+                indexes[name].setdefault(key_of(item), []).append(item)
+        with self._lock:
+            self._items, self._view, self._indexes = items, view, indexes
+            self.version += 1
+
+    def rebuild(self):
+        """Rebuild the indexes, e.g. after the overlay changed."""
+        with self._lock:
+            items = self._items
+        self._build(items)
+
+    def refresh(self):
+        """Bring the copy up to date. Raises requests exceptions if the server cannot be reached."""
+        with self._refresh_lock:
+            response = get_http_client().get(self.url, headers=self._validators)
+            if response.status_code == 304:
+                self._synced_at = time.monotonic()
+                return
+            response.raise_for_status()
+            self._build(response.json().get("data", []))
+            self._validators = {header: response.headers[source] for header, source in
+                                (("If-None-Match", "ETag"), ("If-Modified-Since", "Last-Modified")) if source in response.headers}
+            self._synced_at = time.monotonic()
+
+    def age(self) -> float | None:
+        """Seconds since the last successful refresh, None if the collection was never loaded."""
+        return None if self._synced_at is None else time.monotonic() - self._synced_at
+
+    def _ensure_fresh(self):
+        age = self.age()
+        if age is None or age > self.max_staleness:
+            self.refresh()
+
+    def items(self) -> list[dict]:
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._view)
+
+    def lookup(self, index: str, key: str) -> list[dict]:
+        """All items whose index key equals key, e.g. lookup("name", "milk")."""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._indexes[index].get(key, []))
+
+    def _post(self, item: dict):
+        return get_http_client().post(self.url, headers={"Content-Type": "application/json"}, json=item)
+
+    def post_many(self, items: list[dict]) -> list:
+        """
+        POST all items concurrently without touching the copy.
+        Returns, per item, the server's response or the requests exception the POST raised.
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(items), HTTP_POOL_SIZE)) as executor:
+            futures = [executor.submit(self._post, item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except requests.exceptions.RequestException as e:
+                results.append(e)
+        return results
+
+    def insert(self, items: list[dict], results: list):
+        """Add the items the server accepted (per post_many's results) to the copy, rebuilding the indexes once."""
+        accepted = []
+        for item, response in zip(items, results):
+            if isinstance(response, Exception) or response.status_code not in (200, 201):
+                continue
+            try:
+                created = response.json()
+            except ValueError:
+                created = {}
+            if isinstance(created, dict) and "ID" in created:
+                item = {**item, "ID": created["ID"]}
+            accepted.append(item)
+        with self._lock:
+            items = self._items + accepted
+        self._build(items)
+
+    def add_many(self, items: list[dict]) -> list:
+        """POST all items concurrently and add the accepted ones to the copy. Returns the results of post_many."""
+        results = self.post_many(items)
+        self.insert(items, results)
+        return results
+
+    def add(self, item: dict):
+        """POST item to the server and, if it was accepted, to the copy. Returns the server's response."""
+        result = self.add_many([item])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class BackendReplica:
+    """
+    Local replica of the storage server's /storage and /shopping_list collections. A background thread refreshes
+    both every REPLICA_SYNC_INTERVAL seconds, so tools answer from memory; writes go through the replica
+    (ReplicatedCollection.add) and keep it coherent with the server.
+    """
+    def __init__(self, base_url: str = STORAGE_SERVER_URL, max_staleness: float = REPLICA_MAX_STALENESS):
+        self.storage = ReplicatedCollection(f"{base_url}/storage", {
+            "name": lambda item: str(item.get("Name", "")).strip().lower(),
+        }, max_staleness)
+        self.shopping_list = ReplicatedCollection(f"{base_url}/shopping_list", {
+            "name": lambda item: str(item.get("Name", "")).strip().lower(),
+            "list": lambda item: extract_date_from_list_entry(item.get("List", "")),
+        }, max_staleness)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, interval: float = REPLICA_SYNC_INTERVAL):
+        """Refresh both collections now and then every interval seconds on a background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop_event.is_set():
+            for collection in (self.storage, self.shopping_list):
+                try:
+                    collection.refresh()
+                except Exception as e:
+                    logger.warning("Refreshing the replica of {} failed: {}", collection.url, e)
+            self._stop_event.wait(interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def get_backend_replica() -> BackendReplica:
+    """Return the shared replica of the storage server."""
+    global _replica
+    with _replica_lock:
+        if _replica is None:
+            _replica = BackendReplica()
+        return _replica
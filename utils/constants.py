@@ -6,6 +6,71 @@ FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 24000
 
+# Bounded capacities of the audio hops
+MIC_QUEUE_SIZE = 16                 # ~0.7 s of microphone audio, oldest chunks are dropped
+SPEAKER_RING_BYTES = 2 ** 20        # shared-memory ring to the speaker process (~20 s at RATE), playback blocks the producer when full
+SPEAKER_PERIOD_FRAMES = 480         # frames the speaker process writes per iteration (20 ms at RATE)
+SPEAKER_BLOCK_INTERVAL = 0.01       # seconds to wait before retrying a write to a full speaker ring
+SPEAKER_DRAIN_CHECK_INTERVAL = 0.25 # longest sleep of Speaker.drained() before re-checking the playback status
+MUSIC_RING_BYTES = 2 ** 20          # shared-memory ring from the music decoder to the speaker process (~2.7 s of 48 kHz stereo float32)
+MUSIC_WRITE_INTERVAL = 0.01         # seconds the music decoder waits before retrying a write to a full ring
+MUSIC_DUCK_GAIN = 0.25              # music gain while Luna is listening and speaking
+MUSIC_FADE_SECONDS = 0.3            # duration of the fade into and out of the ducked gain
+MUSIC_PAUSE_MODE = "buffer"         # "buffer": keep the paused stream in the ring and resume where it stopped, "discard": keep decoding and drop it
+MUSIC_STOP_TIMEOUT = 2.0            # seconds the music decoder gets to shut down before it is terminated
+MUSIC_PREBUFFER_SECONDS = 1.0       # music buffered before playback starts, and refilled after an underrun
+MUSIC_RECONNECT_DELAY = 0.5         # first delay before reconnecting a dropped radio stream, doubled on every failed attempt
+MUSIC_MAX_RECONNECT_DELAY = 30.0    # upper bound of the reconnect delay
+MUSIC_MAX_RECONNECTS = 8            # consecutive reconnects without any audio before the stream is given up
+
+EARCON_TOOL_THRESHOLD = 1.5         # seconds a tool may run before a filler earcon is played
+
+STATION_PROBE_TIMEOUT = 10          # seconds before an ffprobe of a radio station is given up
+STATION_REFRESH_INTERVAL = 6 * 3600 # seconds between background probes of a healthy station
+STATION_RETRY_INTERVAL = 60         # first backoff after a failed probe, doubled on every further failure
+STATION_MAX_RETRY_INTERVAL = 3600   # upper bound of the probe backoff
+
+SPOTIFY_DEVICE_NAME = "KITCHEN_VA"   # Spotify Connect name of the assistant, replace with your computer's Spotify name
+SPOTIFY_REQUEST_TIMEOUT = 5         # seconds before a Spotify Web API request is given up
+SPOTIFY_TOKEN_REFRESH_MARGIN = 300  # seconds before expiry at which the Spotify access token is refreshed
+SPOTIFY_POLL_PLAYING = 10           # seconds between playback state polls while Spotify is playing
+SPOTIFY_POLL_IDLE = 60              # seconds between playback state polls while nothing plays
+SPOTIFY_POLL_AFTER_COMMAND = 2      # delay of the poll that confirms one of our own commands
+SPOTIFY_SEARCH_LIMIT = 5            # candidates per type of one Spotify search
+SPOTIFY_MIN_MATCH_SCORE = 50        # lowest score (0-100 plus bonuses) a search candidate needs to be played
+SPOTIFY_RESOLVE_CACHE_SIZE = 256    # resolved requests kept in memory
+SPOTIFY_RESOLVE_CACHE_TTL = 24 * 3600  # seconds a resolved request is reused without searching again
+SPOTIFY_LIBRARY_SYNC_INTERVAL = 15 * 60  # seconds between syncs of the local Spotify library
+SPOTIFY_LIBRARY_MIN_SCORE = 85      # lowest score a library entry needs to be played without a search
+
+HTTP_TIMEOUT = (3.05, 10)           # (connect, read) seconds of a request to the kitchen servers
+HTTP_RETRIES = 2                    # retries of a failed connection or a 502/503/504 response
+HTTP_RETRY_BACKOFF = 0.3            # seconds before the first retry, doubled on every further one
+HTTP_POOL_SIZE = 4                  # keep-alive connections kept open per host
+HTTP_BREAKER_THRESHOLD = 3          # consecutive failures after which a host is no longer contacted
+HTTP_BREAKER_RESET = 30             # seconds before a host with an open circuit breaker is tried again
+REPLICA_SYNC_INTERVAL = 30          # seconds between background refreshes of the storage and shopping list replica
+REPLICA_MAX_STALENESS = 120         # oldest replica (in seconds) a tool answers from without refreshing it first
+WRITE_BEHIND_RETRY_DELAY = 2        # seconds before a queued addition that failed is sent again, doubled on every further failure
+WRITE_BEHIND_MAX_RETRY_DELAY = 300  # upper bound of the retry delay
+WRITE_BEHIND_COMPACT_BYTES = 2 ** 16  # size of the write-behind log above which it is rewritten once the queue is empty
+FORECAST_TTL = 3600                 # seconds a downloaded weather forecast is answered from
+FORECAST_REFRESH_MARGIN = 300       # seconds before expiry at which the forecast is downloaded again in the background
+WEATHER_CITY = "Berlin,DE"          # city and country code of the weather forecast (e.g. London,GB)
+VISION_DETAIL = "high"              # detail level of camera images sent to the vision model: "low", "high" or "auto"
+VISION_MAX_SIDE = 1024              # longer side of camera images for "high" detail, the model scales larger images down to this anyway
+VISION_LOW_DETAIL_SIDE = 512        # longer side of camera images for "low" detail, the model sees a 512 x 512 version
+VISION_JPEG_QUALITY = 85            # JPEG quality of the downscaled camera images
+
+STORAGE_SERVER_URL = "http://130.149.154.54:3000"  # inventory and shopping list backend
+STORAGE_API_URL = "http://130.149.154.54/api"       # storage server's web API, answers product availability queries
+ESP32_RELAY_URL = "http://10.42.8.215"              # ESP32 switching the cabinet relays
+ESP32_CAMERA_URL = "http://10.42.0.64"              # ESP32-CAM above the cupboard
+OPENAI_API_URL = "https://api.openai.com/v1"
+
+DEVICE_RETRY_INTERVAL = 1.0         # seconds between attempts to reopen an unplugged audio device
+RESPEAKER_POLL_INTERVAL = 0.02      # seconds between DOA/VAD reads of the ReSpeaker tuning service
+
 SYSTEM_PROMPT = """
 You are a helpful speech-to-speech assistant named Luna. Luna is designed to be able to assist with a wide range of tasks and execute tools. 
 Luna is located in the ZEKI office kitchen at Technische Universitaet Berlin. Luna always gives short answers. 
@@ -17,6 +82,12 @@ Luna always answers in the language of the current question.
 PIXEL_RING_PATH = "pixel_ring/pixel_ring/led_control.py"
 KEYWORD_PATH = os.path.abspath(os.path.join(".", "custom_wakewords", "Hey-Luna_de_windows_v3_0_0.ppn"))
 MODEL_FILE_PATH = os.path.abspath(os.path.join(".", "custom_wakewords", "porcupine_params_de_v3.pv"))
+EARCONS_PATH = os.path.abspath(os.path.join(".", "audios", "earcons"))
+DATA_PATH = os.path.abspath(os.path.join(".", "data"))     # state written at runtime, not part of the repository
+STATION_CACHE_PATH = os.path.join(DATA_PATH, "station_cache.json")
+SPOTIFY_LIBRARY_PATH = os.path.join(DATA_PATH, "spotify_library.json")
+WRITE_BEHIND_PATH = os.path.join(DATA_PATH, "write_behind.jsonl")
+RADIO_CONFIG_PATH = os.path.abspath(os.path.join(".", "intents", "config_start_radio.yaml"))
 
 tts = None
 spotify = None
@@ -0,0 +1,85 @@
+import os
+import random
+import numpy as np
+from loguru import logger
+
+from .constants import RATE, CHANNELS, EARCONS_PATH
+from .audio_convert import AudioConverter, float32_to_int16
+
+# Tones synthesized when no recording with the same name exists: (frequency in Hz, seconds) per note
+SYNTHESIZED_EARCONS = {
+    "wake": [(660, 0.07), (880, 0.09)],
+    "thinking": [(523, 0.08), (0, 0.06), (523, 0.08)],
+}
+EARCON_LEVEL = 0.3
+FADE_SECONDS = 0.005
+
+
+def synthesize(notes: list[tuple[float, float]], level: float = EARCON_LEVEL, rate: int = RATE) -> np.ndarray:
+    """Render a sequence of sine notes (frequency 0 is a pause) with short fades, as float32 samples."""
+    parts = []
+    fade = int(FADE_SECONDS * rate)
+    for frequency, seconds in notes:
+        t = np.arange(int(seconds * rate)) / rate
+        note = level * np.sin(2 * np.pi * frequency * t) if frequency else np.zeros(len(t))
+        if frequency and len(note) > 2 * fade:
+            ramp = np.linspace(0.0, 1.0, fade)
+            note[:fade] *= ramp
+            note[-fade:] *= ramp[::-1]
+        parts.append(note)
+    return np.concatenate(parts).astype(np.float32)
+
+
+class EarconBank:
+    """
+    Short acknowledgement sounds and filler phrases, decoded once at startup to the Speaker's format
+    (int16 PCM at RATE) and kept in memory, so playing one is a single copy into the speaker ring.
+    Recordings in directory override the synthesized tones of the same name; files named filler_*
+    are prerecorded phrases played while a slow tool is running.
+    """
+    def __init__(self, directory: str = EARCONS_PATH):
+        self._sounds: dict[str, bytes] = {}
+        self._fillers: list[bytes] = []
+        for name, notes in SYNTHESIZED_EARCONS.items():
+            self._sounds[name] = float32_to_int16(synthesize(notes)).tobytes()
+        if os.path.isdir(directory):
+            self._load(directory)
+        logger.debug("Earcons loaded: {}, filler phrases: {}", ", ".join(self._sounds), len(self._fillers))
+
+    def _load(self, directory: str):
+        try:
+            import soundfile as sf
+        except ImportError as e:
+            logger.warning("Cannot load recorded earcons: {}", e)
+            return
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension.lower() not in (".wav", ".flac", ".ogg"):
+                continue
+            try:
+                data, rate = sf.read(os.path.join(directory, file_name), dtype="float32", always_2d=True)
+            except RuntimeError as e:
+                logger.error("Could not read earcon {}: {}", file_name, e)
+                continue
+            converter = AudioConverter(rate, RATE, data.shape[1], CHANNELS, in_dtype="float32")
+            pcm = converter.convert(data).tobytes()
+            if name.startswith("filler_"):
+                self._fillers.append(pcm)
+            else:
+                self._sounds[name] = pcm
+
+    def names(self) -> list[str]:
+        return list(self._sounds)
+
+    def get(self, name: str) -> bytes | None:
+        """PCM of the earcon, or of a random filler phrase for "filler" (falling back to the thinking tone)."""
+        if name == "filler":
+            return random.choice(self._fillers) if self._fillers else self._sounds.get("thinking")
+        return self._sounds.get(name)
+
+    async def play(self, speaker, name: str):
+        pcm = self.get(name)
+        if pcm is None:
+            logger.warning("Unknown earcon: {}", name)
+            return
+        await speaker.play_chunk(pcm)
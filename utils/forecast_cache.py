@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+import dotenv
+from loguru import logger
+
+from .http_client import get_http_client
+from .constants import FORECAST_TTL, FORECAST_REFRESH_MARGIN
+
+FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+KELVIN = 273.15
+
+
+class DaySummary(NamedTuple):
+    """Weather of one day, reduced from the 3-hour forecast entries."""
+    max_temperature: float      # °C
+    min_temperature: float      # °C
+    description: str            # most frequent description of the day
+    rain_percentage: float      # mean probability of precipitation
+
+
+def summarize(entries: list[dict]) -> dict[str, DaySummary]:
+    """Reduce the entries of a 5-day/3-hour forecast to one DaySummary per date (YYYY-MM-DD)."""
+    if not entries:
+        return {}
+    dates = np.array([entry['dt_txt'].split()[0] for entry in entries])
+    temp_max = np.array([entry['main']['temp_max'] for entry in entries]) - KELVIN
+    temp_min = np.array([entry['main']['temp_min'] for entry in entries]) - KELVIN
+    pop = np.array([entry.get('pop', 0) for entry in entries]) * 100
+    descriptions = np.array([entry['weather'][0]['description'] for entry in entries])
+
+    days, day_of_entry, counts = np.unique(dates, return_inverse=True, return_counts=True)
+    max_per_day = np.full(len(days), -np.inf)
+    min_per_day = np.full(len(days), np.inf)
+    np.maximum.at(max_per_day, day_of_entry, temp_max)
+    np.minimum.at(min_per_day, day_of_entry, temp_min)
+    rain_per_day = np.bincount(day_of_entry, weights=pop) / counts
+
+    # Most frequent description per day: count every (day, description) pair, keep the first maximum per day
+    names, description_of_entry = np.unique(descriptions, return_inverse=True)
+    pair_counts = np.zeros((len(days), len(names)), dtype=int)
+    np.add.at(pair_counts, (day_of_entry, description_of_entry), 1)
+    dominant = names[pair_counts.argmax(axis=1)]
+
+    return {str(day): DaySummary(float(max_per_day[i]), float(min_per_day[i]), str(dominant[i]), float(rain_per_day[i]))
+            for i, day in enumerate(days)}
+
+
+class ForecastCache:
+    """
+    OpenWeather 5-day forecasts per city, reduced once per download into DaySummary objects, so a weather question
+    is a dictionary lookup. Entries expire after FORECAST_TTL seconds; a background thread downloads them again
+    FORECAST_REFRESH_MARGIN seconds before they expire, so a question only waits for the network on a cold cache.
+    """
+    def __init__(self, ttl: float = FORECAST_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cities: dict[str, tuple[float, dict[str, DaySummary]]] = {}   # city -> (expires, summaries)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def refresh(self, city: str) -> dict[str, DaySummary]:
+        """Download and summarize the forecast of city ("Berlin,DE"). Raises requests exceptions on failure."""
+        dotenv.load_dotenv()
+        response = get_http_client().get(FORECAST_URL, params={'q': city, 'appid': os.environ.get('OPEN_WEATHER_API')})
+        response.raise_for_status()
+        summaries = summarize(response.json()['list'])
+        with self._lock:
+            self._cities[city] = (time.monotonic() + self.ttl, summaries)
+        logger.debug("Weather forecast of {} refreshed: {} days.", city, len(summaries))
+        return summaries
+
+    def get(self, city: str) -> dict[str, DaySummary]:
+        """Summaries of city by date, downloaded only if the cached forecast expired."""
+        with self._lock:
+            expires, summaries = self._cities.get(city, (0.0, None))
+        if summaries is None or expires <= time.monotonic():
+            summaries = self.refresh(city)
+        return summaries
+
+    def start(self, cities: list[str]):
+        """Keep the forecasts of cities fresh on a background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(list(cities),), daemon=True)
+        self._thread.start()
+
+    def _run(self, cities):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            for city in cities:
+                with self._lock:
+                    expires = self._cities.get(city, (0.0, None))[0]
+                if expires - FORECAST_REFRESH_MARGIN <= now:
+                    try:
+                        self.refresh(city)
+                    except Exception as e:
+                        logger.warning("Refreshing the weather forecast of {} failed: {}", city, e)
+            with self._lock:
+                next_refresh = min((self._cities.get(city, (0.0, None))[0] for city in cities), default=now) - FORECAST_REFRESH_MARGIN
+            # After a failure the entry is still due, retry after the margin instead of spinning
+            self._stop_event.wait(max(next_refresh - time.monotonic(), FORECAST_REFRESH_MARGIN / 10))
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Return the shared forecast cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ForecastCache()
+        return _cache
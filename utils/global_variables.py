@@ -1,3 +1,5 @@
 tts = None
 spotify = None
-radio_player = None
\ No newline at end of file
+radio_player = None
+pixel_ring = None
+respeaker = None
\ No newline at end of file
@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from loguru import logger
+
+from .constants import (HTTP_TIMEOUT, HTTP_RETRIES, HTTP_RETRY_BACKOFF, HTTP_POOL_SIZE, HTTP_BREAKER_THRESHOLD,
+                        HTTP_BREAKER_RESET, STORAGE_SERVER_URL, STORAGE_API_URL, ESP32_RELAY_URL, ESP32_CAMERA_URL, OPENAI_API_URL)
+
+
+class HostPolicy(NamedTuple):
+    """Timeout, retry and circuit breaker settings of one host."""
+    timeout: tuple[float, float] = HTTP_TIMEOUT     # (connect, read) seconds
+    retries: int = HTTP_RETRIES
+    retry_reads: bool = True        # False for endpoints with side effects, e.g. a relay that toggles on every GET
+    breaker_threshold: int = HTTP_BREAKER_THRESHOLD
+    breaker_reset: float = HTTP_BREAKER_RESET
+
+
+# The ESP32s fail fast, the relay is never retried once the request was sent, the vision and chat calls may take long
+HOST_POLICIES = {
+    urlsplit(STORAGE_SERVER_URL).netloc: HostPolicy(),
+    urlsplit(STORAGE_API_URL).netloc: HostPolicy(),
+    urlsplit(ESP32_RELAY_URL).netloc: HostPolicy(timeout=(2, 5), retries=1, retry_reads=False),
+    urlsplit(ESP32_CAMERA_URL).netloc: HostPolicy(timeout=(2, 10), retries=1),
+    urlsplit(OPENAI_API_URL).netloc: HostPolicy(timeout=(5, 60), retries=1, breaker_threshold=5),
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without a network call while a host's circuit breaker is open."""
+
+
+class _HostState:
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.failures = 0           # consecutive failures
+        self.open_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+
+class HttpClient:
+    """
+    One requests.Session for all intents: keep-alive connection pools per host, a (connect, read) timeout on
+    every request, retries with backoff on connection errors and 502/503/504, and a circuit breaker per host.
+    After breaker_threshold consecutive failures a host is not contacted for breaker_reset seconds, then one
+    request is let through to test it. Request counts and timings per host are available from stats().
+    """
+    def __init__(self, policies: dict[str, HostPolicy] = HOST_POLICIES, default: HostPolicy = HostPolicy()):
+        self.default = default
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._hosts: dict[str, _HostState] = {}
+        self._policies = dict(policies)
+        self.session.mount("http://", self._adapter(default))
+        self.session.mount("https://", self._adapter(default))
+        for host, policy in self._policies.items():
+            for scheme in ("http", "https"):
+                self.session.mount(f"{scheme}://{host}/", self._adapter(policy))
+
+    @staticmethod
+    def _adapter(policy: HostPolicy) -> HTTPAdapter:
+        # Without retry_reads only connection failures are retried: a read error, an error status or any
+        # other failure means the request may have reached the host, and sending it again repeats its effect
+        resent = policy.retries if policy.retry_reads else 0
+        retry = Retry(total=policy.retries, connect=policy.retries, read=resent, status=resent, other=resent,
+                      backoff_factor=HTTP_RETRY_BACKOFF, status_forcelist=(502, 503, 504), raise_on_status=False)
+        return HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+
+    def _host(self, url: str) -> _HostState:
+        host = urlsplit(url).netloc
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self._policies.get(host, self.default))
+            return state
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        state = self._host(url)
+        now = time.monotonic()
+        with self._lock:
+            if state.open_until > now:
+                state.rejected += 1
+                raise CircuitOpenError(f"{urlsplit(url).netloc} is unreachable, not retrying for {state.open_until - now:.1f} s.")
+            if state.failures >= state.policy.breaker_threshold:
+                # Half-open: let this request through, a failure opens the breaker again right away
+                state.open_until = now + state.policy.breaker_reset
+        kwargs.setdefault("timeout", state.policy.timeout)
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(state, time.monotonic() - start, failed=True)
+            raise
+        self._record(state, time.monotonic() - start, failed=response.status_code >= 500)
+        logger.debug("HTTP {} {} -> {} in {:.0f} ms", method, url, response.status_code, (time.monotonic() - start) * 1000)
+        return response
+
+    def _record(self, state: _HostState, duration: float, failed: bool):
+        with self._lock:
+            state.requests += 1
+            state.total_time += duration
+            state.max_time = max(state.max_time, duration)
+            if not failed:
+                state.failures = 0
+                state.open_until = 0.0
+                return
+            state.errors += 1
+            state.failures += 1
+            if state.failures >= state.policy.breaker_threshold:
+                state.open_until = time.monotonic() + state.policy.breaker_reset
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict[str, dict]:
+        """Per host: requests, errors, requests rejected by the breaker, mean and max duration in ms."""
+        with self._lock:
+            return {host: {
+                "requests": state.requests,
+                "errors": state.errors,
+                "rejected": state.rejected,
+                "mean_ms": round(state.total_time / state.requests * 1000) if state.requests else 0,
+                "max_ms": round(state.max_time * 1000),
+                "open": state.open_until > time.monotonic(),
+            } for host, state in self._hosts.items()}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the shared HTTP client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,54 @@
+import base64
+import io
+from PIL import Image, UnidentifiedImageError
+
+from .http_client import get_http_client
+from .constants import ESP32_CAMERA_URL, VISION_MAX_SIDE, VISION_JPEG_QUALITY
+
+JPEG_START = b"\xff\xd8"
+JPEG_END = b"\xff\xd9"
+MIN_FRAME_BYTES = 1024          # an ESP32-CAM frame below this size is a failed capture
+
+
+class CaptureError(Exception):
+    """The camera did not deliver a usable frame."""
+
+
+def capture_frame(url: str = f"{ESP32_CAMERA_URL}/capture") -> bytes:
+    """Fetch one JPEG frame from the camera and check that it is complete. Raises CaptureError otherwise."""
+    response = get_http_client().get(url)
+    if response.status_code != 200:
+        raise CaptureError(f"The camera returned status code {response.status_code}.")
+    frame = response.content
+    # A frame cut off by a brown-out or a dropped connection misses the end-of-image marker
+    if len(frame) < MIN_FRAME_BYTES or not frame.startswith(JPEG_START) or not frame.rstrip(b"\x00").endswith(JPEG_END):
+        raise CaptureError(f"The camera returned an incomplete image ({len(frame)} bytes).")
+    return frame
+
+
+def prepare_image(frame: bytes, max_side: int | None = VISION_MAX_SIDE, quality: int = VISION_JPEG_QUALITY) -> bytes:
+    """
+    Decode frame, scale it down so that its longer side is at most max_side (None keeps the resolution)
+    and encode it again as JPEG. A frame that needs no scaling is only re-encoded if that makes it smaller.
+    """
+    try:
+        image = Image.open(io.BytesIO(frame))
+        original_size = image.size
+        if max_side is not None:
+            # Let the JPEG decoder skip detail it would only throw away (DCT scaling), then resample exactly
+            image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+    except (UnidentifiedImageError, OSError) as e:
+        raise CaptureError(f"The camera image cannot be decoded: {e}") from e
+    if max_side is not None:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    prepared = output.getvalue()
+    if image.size == original_size and len(prepared) >= len(frame):
+        return frame
+    return prepared
+
+
+def image_data_url(jpeg: bytes) -> str:
+    return f"data:image/jpeg;base64,{base64.b64encode(jpeg).decode('ascii')}"
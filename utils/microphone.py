@@ -1,36 +1,61 @@
 import asyncio
 import json
 import base64
-import pyaudio
-import queue
 import threading
 from typing import AsyncIterator
 from contextlib import asynccontextmanager
 from loguru import logger
 
-from .constants import CHUNK_SIZE, FORMAT, CHANNELS, RATE
+from .constants import CHUNK_SIZE, FORMAT, CHANNELS, RATE, MIC_QUEUE_SIZE, DEVICE_RETRY_INTERVAL
+from .audio_devices import get_device_manager
+from .audio_convert import AudioConverter
+from .queues import AsyncDropOldestQueue
+
+_STOP = object()
 
 class MicGenerator:
-    def __init__(self, audio_queue: queue.Queue, stop_event: threading.Event):
-        self.audio_queue = audio_queue
+    """
+    Async iterator over microphone events. The capture thread hands chunks to the event loop with
+    loop.call_soon_threadsafe(), so no worker thread is needed per read and stop() takes effect immediately.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, stop_event: threading.Event, maxsize: int = MIC_QUEUE_SIZE):
+        self.loop = loop
         self.stop_event = stop_event
+        self.audio_queue = AsyncDropOldestQueue(maxsize, name="microphone")
+
+    @property
+    def stats(self):
+        """Depth and drop counters of the microphone queue."""
+        return self.audio_queue.stats
+
+    def push(self, chunk: str):
+        """Called from the capture thread: schedule the chunk on the event loop."""
+        self.loop.call_soon_threadsafe(self._put, chunk)
+
+    def _put(self, chunk):
+        if not self.stop_event.is_set():
+            self.audio_queue.put_nowait(chunk)
 
     def stop(self):
         """Stop sending audio immediately."""
         logger.info("Stopped audio input stream")
         self.stop_event.set()
+        # Wake up a pending __anext__ without waiting for the next chunk
+        self.loop.call_soon_threadsafe(self.audio_queue.put_nowait, _STOP)
 
     def __aiter__(self):
         # Return the async iterator (self)
         return self
 
     async def __anext__(self) -> str:
-        # Wait for the next chunk from the queue (executed in a worker thread)
-        chunk = await asyncio.to_thread(self.audio_queue.get)
-        
         if self.stop_event.is_set():
             raise StopAsyncIteration
-        
+
+        chunk = await self.audio_queue.get()
+
+        if chunk is _STOP or self.stop_event.is_set():
+            raise StopAsyncIteration
+
         return chunk
 
 
@@ -39,49 +64,68 @@ async def open_microphone() -> AsyncIterator[MicGenerator]:
     """
     Async context manager that yields an async generator of audio events.
     Internally, microphone capture runs on a separate thread.
+    The queue is bounded: if the consumer stalls, the oldest chunks are dropped so only recent audio is sent.
     """
-    audio_queue = queue.Queue()
     stop_event = threading.Event()
+    mic_gen = MicGenerator(asyncio.get_running_loop(), stop_event)
 
     def mic_thread():
         """
         Thread target: Continuously read audio from PyAudio and push into the queue.
+        The input stream comes from the shared device manager and is returned to its pool afterwards.
+        It runs at the device's native rate and is converted to the RATE expected by the Realtime API.
         """
-        p = pyaudio.PyAudio()
-        stream = p.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=RATE,
-            input=True,
-            frames_per_buffer=CHUNK_SIZE
-        )
+        devices = get_device_manager()
+        stream = None
         try:
             while not stop_event.is_set():
-                data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
-                encoded = base64.b64encode(data).decode("utf-8")
+                if stream is None:
+                    try:
+                        device_rate = devices.default_rate()
+                        converter = AudioConverter(device_rate, RATE, CHANNELS, CHANNELS)
+                        read_size = CHUNK_SIZE * device_rate // RATE
+                        stream = devices.open_stream(
+                            format=FORMAT,
+                            channels=CHANNELS,
+                            rate=device_rate,
+                            input=True,
+                            frames_per_buffer=read_size
+                        )
+                        generation = devices.stream_generation(stream)
+                    except OSError as e:
+                        logger.error("Could not open the microphone: {}", e)
+                        devices.recover()
+                        stop_event.wait(DEVICE_RETRY_INTERVAL)
+                        continue
+                try:
+                    data = stream.read(read_size, exception_on_overflow=False)
+                except OSError as e:
+                    # Device error, e.g. the microphone was unplugged: reinitialize PortAudio and reopen
+                    logger.warning("Microphone read failed ({}), reopening the device.", e)
+                    devices.discard(stream)
+                    devices.recover(generation)
+                    stream = None
+                    continue
+                encoded = base64.b64encode(converter.convert(data).tobytes()).decode("utf-8")
                 event_json = json.dumps({
                     "type": "input_audio_buffer.append",
                     "audio": encoded
                 })
-                audio_queue.put(event_json)
+                mic_gen.push(event_json)
         except Exception as e:
             print("Microphone thread exception:", e)
         finally:
-            # Push a final 'end' event so the async generator can finish gracefully
-            # audio_queue.put(json.dumps({"type": "input_audio_buffer.clear"}))
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
+            if stream is not None:
+                devices.release(stream)
 
     # Start the microphone capture thread
     t = threading.Thread(target=mic_thread, daemon=True)
     t.start()
     print("Microphone activated in separate thread...")
 
-
-    mic_gen = MicGenerator(audio_queue, stop_event)
     try:
         yield mic_gen
     finally:
         stop_event.set()
         t.join()
+        logger.debug("Microphone queue: {}", mic_gen.stats.snapshot())
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class Mixer:
+    """
+    Sums the assistant's voice and the music into one output block, scaling the music in place by volume.
+    While ducked, the music gain moves to duck_gain with a linear fade of fade_seconds, and back to 1.0 afterwards,
+    so the radio keeps playing quietly under Luna's voice instead of being stopped.
+    All buffers are allocated once for blocks of up to max_frames.
+    """
+    def __init__(self, rate: int, channels: int, max_frames: int, duck_gain: float = 0.25, fade_seconds: float = 0.3):
+        self.channels = channels
+        self.duck_gain = duck_gain
+        self.volume = 1.0
+        self.gain = 1.0
+        self.target_gain = 1.0
+        self._out = np.zeros((max_frames, channels), dtype=np.float32)
+        self._ramp = np.empty(max_frames, dtype=np.float32)
+        self._fade_steps = np.arange(1, max_frames + 1, dtype=np.float32) / max(1.0, fade_seconds * rate)
+
+    def set_ducked(self, ducked: bool):
+        self.target_gain = self.duck_gain if ducked else 1.0
+
+    def set_volume(self, volume: float):
+        self.volume = volume
+
+    def _apply_gain(self, music: np.ndarray, out: np.ndarray):
+        frames = len(music)
+        if self.gain == self.target_gain:
+            np.multiply(music, self.gain * self.volume, out=out)
+            return
+        # Linear fade from the current gain towards the target, clamped at the target
+        ramp = self._ramp[:frames]
+        if self.target_gain < self.gain:
+            np.subtract(self.gain, self._fade_steps[:frames], out=ramp)
+            np.maximum(ramp, self.target_gain, out=ramp)
+        else:
+            np.add(self.gain, self._fade_steps[:frames], out=ramp)
+            np.minimum(ramp, self.target_gain, out=ramp)
+        self.gain = float(ramp[-1])
+        ramp *= self.volume
+        np.multiply(music, ramp[:, None], out=out)
+
+    def mix(self, voice: np.ndarray | None, music: np.ndarray | None, frames: int) -> np.ndarray:
+        """
+        Mix (frames, channels) float32 blocks; either may be None. Returns a view of the internal
+        output buffer, valid until the next call.
+        """
+        out = self._out[:frames]
+        if music is None:
+            out[:] = 0
+        else:
+            self._apply_gain(music, out)
+        if voice is not None:
+            out += voice
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
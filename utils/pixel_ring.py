@@ -0,0 +1,42 @@
+import queue
+import subprocess
+import threading
+from loguru import logger
+
+from .constants import PIXEL_RING_PATH
+from .queues import CoalescingQueue
+
+
+class PixelRingController:
+    """
+    Runs the LED control script on a worker thread. Modes are coalesced: if the LEDs fall behind,
+    intermediate modes are skipped and only the latest one is shown. Callers never block on the USB device.
+    """
+    def __init__(self, script_path: str = PIXEL_RING_PATH):
+        self.script_path = script_path
+        self._modes = CoalescingQueue("led")
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    @property
+    def stats(self):
+        return self._modes.stats
+
+    def set_mode(self, mode: str):
+        self._modes.put(mode)
+
+    def _worker(self):
+        while True:
+            try:
+                mode = self._modes.get()
+            except queue.Empty:
+                break
+            try:
+                subprocess.run(["python", self.script_path, mode])
+            except Exception as e:
+                logger.error("Could not set LED mode {}: {}", mode, e)
+
+    def close(self, timeout: float = 5.0):
+        """Apply the last pending mode and stop the worker."""
+        self._modes.close()
+        self._thread.join(timeout)
@@ -0,0 +1,140 @@
+import re
+import threading
+from rapidfuzz import process, fuzz
+
+from .backend_replica import get_backend_replica
+
+# German and English names of common kitchen products, both mapped to the English singular used in the inventory
+PRODUCT_ALIASES = {
+    "apfel": "apple", "aepfel": "apple",
+    "banane": "banana",
+    "birne": "pear",
+    "orange": "orange", "apfelsine": "orange",
+    "zitrone": "lemon",
+    "tomate": "tomato",
+    "gurke": "cucumber",
+    "kartoffel": "potato",
+    "zwiebel": "onion",
+    "knoblauch": "garlic",
+    "karotte": "carrot", "moehre": "carrot", "mohrrube": "carrot",
+    "paprika": "bell pepper",
+    "salat": "lettuce",
+    "pilz": "mushroom", "champignon": "mushroom",
+    "ei": "egg", "eier": "egg",
+    "milch": "milk",
+    "butter": "butter",
+    "kaese": "cheese",
+    "joghurt": "yogurt", "jogurt": "yogurt", "yoghurt": "yogurt",
+    "sahne": "cream",
+    "quark": "quark",
+    "mehl": "flour",
+    "zucker": "sugar",
+    "salz": "salt",
+    "pfeffer": "pepper",
+    "reis": "rice",
+    "nudel": "pasta", "nudeln": "pasta", "spaghetti": "pasta",
+    "brot": "bread", "broetchen": "bread roll",
+    "wasser": "water",
+    "saft": "juice",
+    "kaffee": "coffee",
+    "tee": "tea",
+    "oel": "oil", "olivenoel": "olive oil",
+    "essig": "vinegar",
+    "honig": "honey",
+    "marmelade": "jam",
+    "schokolade": "chocolate",
+    "fleisch": "meat",
+    "haehnchen": "chicken", "huhn": "chicken",
+    "wurst": "sausage",
+    "schinken": "ham",
+    "fisch": "fish",
+}
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# English plural endings, longest first: berries -> berry, tomatoes -> tomato, boxes -> box, apples -> apple
+_ENGLISH_PLURALS = (("ies", "y"), ("oes", "o"), ("ches", "ch"), ("shes", "sh"), ("xes", "x"), ("sses", "ss"), ("s", ""))
+# German plural endings, only stripped when the stem is in PRODUCT_ALIASES: Tomaten -> tomate, Zwiebeln -> zwiebel
+_GERMAN_PLURALS = (("en", "e"), ("n", ""), ("e", ""))
+SPLIT_WORDS = re.compile(r"\s*(?:,|\band\b|\bund\b|&|\bor\b|\boder\b)\s*")
+
+
+def singularize(word: str) -> str:
+    """Singular of an English or German product word, by alias table or by stripping the plural ending."""
+    if word in PRODUCT_ALIASES:
+        return PRODUCT_ALIASES[word]
+    for ending, replacement in _GERMAN_PLURALS + _ENGLISH_PLURALS:
+        if len(word) >= len(ending) + 2 and word.endswith(ending):
+            stem = word[:-len(ending)] + replacement
+            # Two-letter stems are too short to tell a plural from another word: "eis" is not "ei"
+            if len(stem) > 2 and stem in PRODUCT_ALIASES:
+                return PRODUCT_ALIASES[stem]
+    if word.endswith("ss"):
+        return word
+    for ending, replacement in _ENGLISH_PLURALS:
+        if len(word) >= len(ending) + 2 and word.endswith(ending):
+            return word[:-len(ending)] + replacement
+    return word
+
+
+def normalize(name: str) -> str:
+    """Lower case, umlauts folded, punctuation removed and every word in its English singular form."""
+    words = _NON_WORD.sub(" ", name.lower().translate(UMLAUTS)).split()
+    return " ".join(singularize(word) for word in words)
+
+
+def split_products(text: str) -> list[str]:
+    """Split an enumeration like "eggs, milk and flour" into its products."""
+    return [part for part in SPLIT_WORDS.split(text) if part.strip()]
+
+
+class ProductIndex:
+    """
+    The product names of the inventory, normalized to lower-case English singular. Exact hits are a dict
+    lookup, everything else ("tomatoe", "corn flakes") goes through rapidfuzz over the normalized names.
+    Names are compared as a whole, so neither "egg" finds "Eggplant" nor "milk" finds "Milk chocolate".
+    The index follows the storage replica and is rebuilt whenever the replica's items change.
+    """
+    def __init__(self, collection=None, score_cutoff: float = 80):
+        self.collection = collection if collection is not None else get_backend_replica().storage
+        self.score_cutoff = score_cutoff
+        self._lock = threading.Lock()
+        self._version = None
+        self._key_to_name: dict[str, str] = {}
+        self._keys: list[str] = []
+
+    def _refresh(self):
+        items = self.collection.items()
+        if self.collection.version == self._version:
+            return
+        with self._lock:
+            key_to_name = {}
+            for item in items:
+                name = str(item.get("Name", "")).strip()
+                if name:
+                    key_to_name.setdefault(normalize(name), name)
+            self._key_to_name = key_to_name
+            self._keys = list(key_to_name)
+            self._version = self.collection.version
+
+    def resolve(self, query: str) -> str | None:
+        """Inventory name of the product meant by query, or None if the inventory has nothing similar."""
+        self._refresh()
+        key = normalize(query)
+        name = self._key_to_name.get(key)
+        if name is not None or not key:
+            return name
+        match = process.extractOne(key, self._keys, scorer=fuzz.token_sort_ratio, score_cutoff=self.score_cutoff)
+        return self._key_to_name[match[0]] if match else None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_product_index() -> ProductIndex:
+    """Return the shared product index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProductIndex()
+        return _index
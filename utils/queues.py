@@ -0,0 +1,104 @@
+import asyncio
+import queue
+import threading
+
+
+class QueueStats:
+    """
+    Counters for one bounded hop in the audio pipeline (depth, drops, coalesced and blocked puts).
+    """
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.depth = 0
+        self.max_depth = 0
+        self.put = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked = 0
+
+    def record_put(self, depth: int):
+        self.put += 1
+        self.depth = depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "capacity": self.capacity,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "put": self.put,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "blocked": self.blocked,
+        }
+
+    def __repr__(self):
+        return f"QueueStats({self.snapshot()})"
+
+
+class AsyncDropOldestQueue(asyncio.Queue):
+    """
+    Bounded asyncio queue for live audio. When it is full, put_nowait() discards the oldest item instead of
+    raising, so a stalled consumer never sees a burst of stale audio afterwards. Must be used from the loop thread.
+    """
+    def __init__(self, maxsize: int, name: str = "queue"):
+        super().__init__(maxsize)
+        self.stats = QueueStats(name, maxsize)
+
+    def put_nowait(self, item):
+        while self.full():
+            super().get_nowait()
+            self.stats.dropped += 1
+        super().put_nowait(item)
+        self.stats.record_put(self.qsize())
+
+    def get_nowait(self):
+        item = super().get_nowait()
+        self.stats.depth = self.qsize()
+        return item
+
+
+class CoalescingQueue:
+    """
+    Single-slot queue for state events (e.g. LED modes). A new item replaces a pending one,
+    so a slow consumer only ever sees the latest state.
+    """
+    def __init__(self, name: str = "state"):
+        self.stats = QueueStats(name, 1)
+        self._condition = threading.Condition()
+        self._item = None
+        self._pending = False
+        self._closed = False
+
+    def put(self, item):
+        with self._condition:
+            if self._pending:
+                self.stats.coalesced += 1
+            self._item = item
+            self._pending = True
+            self.stats.record_put(1)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Return the latest item. Raises queue.Empty on timeout, or when the queue is closed and drained.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending or self._closed, timeout):
+                raise queue.Empty
+            if not self._pending:
+                raise queue.Empty
+            item = self._item
+            self._item = None
+            self._pending = False
+            self.stats.depth = 0
+            return item
+
+    def close(self):
+        """Wake up the consumer; a pending item is still delivered before get() raises queue.Empty."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
@@ -1,127 +1,248 @@
 from loguru import logger
 import sys
+import time
 import ffmpeg
-import sounddevice as sd
 import soundfile as sf
 import multiprocessing
-import queue
 
 import numpy as np
 
+from .audio_convert import AudioConverter
+from .constants import MUSIC_WRITE_INTERVAL, MUSIC_STOP_TIMEOUT, MUSIC_PREBUFFER_SECONDS, MUSIC_RECONNECT_DELAY, MUSIC_MAX_RECONNECT_DELAY, MUSIC_MAX_RECONNECTS
+from .speaker import Speaker, OUTPUT_SAMPLE_SIZE
+from .station_cache import StationCache
+
 # Configure loguru
 logger.remove()  # Remove any existing handlers
 logger.add(sys.stdout, colorize=True, format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <level>{message}</level>")
 
+BLOCK_FRAMES = 1024
+
 # you can find example web radfio stations here: https://hendrikjansen.nl/henk/streaming3.html
 class AudioPlayer:
+	"""
+	Decodes radio streams and audio files in a child process and writes the PCM into the music ring of the Speaker,
+	which mixes it with Luna's voice. Without a speaker, the player starts its own.
+	Stream formats come from the station cache, so a known station starts without an ffprobe round trip.
+	Playback starts after prebuffer seconds are decoded, underruns are refilled, and a dropped stream is
+	reconnected with exponential backoff until max_reconnects attempts in a row brought no audio.
+	"""
 
-	def __init__(self, volume = 0.5):
+	def __init__(self, volume = 0.5, speaker = None, station_cache = None, prebuffer = MUSIC_PREBUFFER_SECONDS, max_reconnects = MUSIC_MAX_RECONNECTS):
 		self._process = None
-		self._volume = volume
+		self._commands = None
 		self._counter = 0
 		self._current_source = None
-		
-	def play_file(self, file):
+		self._speaker = speaker if speaker is not None else Speaker()
+		# Gain, pause and mute live in shared memory and are applied by the speaker process, so they act on the running stream
+		self._control = self._speaker.music_control
+		self.set_volume(volume)
+		self._control.prebuffer = prebuffer
+		self.max_reconnects = max_reconnects
+		self.station_cache = station_cache if station_cache is not None else StationCache()
+
+	def _start(self, target, *args):
 		if self._process:
 			self.stop()
-			
-		self._process = multiprocessing.Process(target=self._play_file, args=(file,))
+		self._control.paused = False
+		self._control.ended = False
+		self._control.buffering = True
+		receiver, self._commands = multiprocessing.Pipe(duplex=False)
+		self._process = multiprocessing.Process(target=target, args=(*args, receiver))
 		self._process.start()
 		
+	def play_file(self, file):
+		self._start(self._play_file, file)
+		
 	def play_stream(self, source):
+		"""Start playing source. Returns False if the station is unreachable."""
+		stream_format = self.station_cache.lookup(source)
+		if stream_format is None:
+			logger.error("Could not start the radio stream {}.", source)
+			return False
 		self._current_source = source
-		if self._process:
-			self.stop()
-		self._process = multiprocessing.Process(target=self._play_stream, args=(source, ))
-		self._process.start()
-		
-	def _play_file(self, file):
-		sd.default.reset()
-		data, fs = sf.read(file, dtype='float32')
-		sd.play(data * self._volume, fs, device=sd.default.device['output'])
-		status = sd.wait()
-		if status:
-			logger.error("Error with playing sound: {}.", status)
-			
-	def _play_stream(self, source):
-		sd.default.reset()
-		_q = queue.Queue(maxsize=20)
+		self._start(self._play_stream, source, stream_format)
+		return True
 
-		logger.debug(f"Playing on device number: {sd.default.device['output']}.")
-		
-		def _callback_stream(outdata, frames, time, status):
-			if status.output_underflow:
-				raise sd.CallbackAbort
-			assert not status
-			
-			try:
-				data = _q.get_nowait()
-				data = data * self._volume
-			except queue.Empty as e:
-				raise sd.CallbackAbort from e
-			assert len(data) == len(outdata)
-			outdata[:] = data
+	def _stop_requested(self, commands, on_seek=None):
+		"""Handle the commands sent by the parent. Returns True once a stop was requested."""
+		while commands.poll():
+			command, *args = commands.recv()
+			if command == "stop":
+				return True
+			if command == "seek" and on_seek is not None:
+				on_seek(*args)
+			elif command == "seek":
+				logger.warning("Seeking is not supported for radio streams.")
+			else:
+				logger.warning("Unknown audio player command: {}", command)
+		return False
+
+	def _write(self, samples, commands, on_seek=None):
+		"""
+		Write float32 frames to the music ring, waiting while it is full. The ring paces the decoder to real time.
+		Returns False if a stop was requested while waiting.
+		"""
+		ring = self._speaker.music_ring
+		data = memoryview(np.ascontiguousarray(samples)).cast("B")
+		while data:
+			written = ring.write(data)
+			if not written:
+				if self._stop_requested(commands, on_seek):
+					return False
+				time.sleep(MUSIC_WRITE_INTERVAL)
+			data = data[written:]
+		return True
+
+	def _converter(self, samplerate, channels):
+		return AudioConverter(samplerate, self._speaker.output_rate, channels, self._speaker.output_channels, in_dtype='float32', out_dtype='float32')
 			
+	def _play_file(self, file, commands):
+		"""
+		Stream the file block by block into one preallocated buffer, so playback starts at once and memory use
+		does not depend on the length of the file. SoundFile.read() is used instead of sf.blocks() to allow seeking.
+		"""
 		try:
-			info = ffmpeg.probe(source)
-		except Exception as e:
-			logger.error(e)
-			
-		streams = info.get('streams', [])
-		if len(streams) != 1:
-			logger.error('Only one stream can be inputted.')
-		
-		stream = streams[0]
-		
-		if stream.get('codec_type') != 'audio':
-			logger.error("Stream has to be an audio stream.")
+			with sf.SoundFile(file) as audio:
+				converter = self._converter(audio.samplerate, audio.channels)
+				block = np.empty((BLOCK_FRAMES, audio.channels), dtype=np.float32)
+
+				def seek(seconds):
+					frame = max(0, min(int(seconds * audio.samplerate), audio.frames))
+					audio.seek(frame)
+					converter.resampler.reset()
+					# Drop what is buffered for the mixer, so the new position is heard immediately
+					self._speaker.music_ring.flush()
+					logger.debug("Seeked {} to {:.1f} s.", file, frame / audio.samplerate)
+
+				while not self._stop_requested(commands, seek):
+					frames = audio.read(out=block)
+					if not len(frames):
+						break
+					if not self._write(converter.convert(frames), commands, seek):
+						break
+		except (RuntimeError, OSError) as e:
+			logger.error("Could not play the file {}: {}", file, e)
+		finally:
+			self._control.ended = True
+
+	def _decode(self, source, channels, samplerate, converter, commands):
+		"""
+		Run one ffmpeg connection to source until it ends. Returns (bytes decoded, whether a stop was requested).
+		"""
+		input_options = {}
+		if source.startswith(("http://", "https://")):
+			# Let ffmpeg retry short network hiccups itself before the connection counts as dropped
+			input_options = {"reconnect": 1, "reconnect_streamed": 1, "reconnect_delay_max": 5}
+		process = ffmpeg.input(source, **input_options).output('pipe:', format='f32le', acodec='pcm_f32le', ac=channels, ar=samplerate, loglevel='quiet').run_async(pipe_stdout=True)
+		#process = ffmpeg.input(source).filter('volume', self._volume).output('pipe:', format='f32le', acodec='pcm_f32le', ac=channels, ar=samplerate, loglevel='quiet').run_async(pipe_stdout=True)
+		read_size = BLOCK_FRAMES * channels * 4
+		received = 0
+		try:
+			while not self._stop_requested(commands):
+				data = process.stdout.read(read_size)
+				if not data:
+					return received, False
+				received += len(data)
+				if not self._write(converter.convert(data), commands):
+					break
+			return received, True
+		finally:
+			process.kill()
+			process.wait()
 			
-		channels = stream['channels']
-		samplerate = float(stream['sample_rate'])
+	def _play_stream(self, source, stream_format, commands):
+		channels = stream_format['channels']
+		samplerate = stream_format['sample_rate']
 		
 		try:
-			process = ffmpeg.input(source).output('pipe:', format='f32le', acodec='pcm_f32le', ac=channels, ar=samplerate, loglevel='quiet').run_async(pipe_stdout=True)
-			#process = ffmpeg.input(source).filter('volume', self._volume).output('pipe:', format='f32le', acodec='pcm_f32le', ac=channels, ar=samplerate, loglevel='quiet').run_async(pipe_stdout=True)
-			#stream = sd.RawOutputStream(samplerate=samplerate, blocksize=1024, device=sd.default.device['output'], channels=channels, dtype='float32', callback=_callback_stream)
-			stream = sd.OutputStream(samplerate=samplerate, blocksize=1024, device=sd.default.device['output'], channels=channels, dtype='float32', callback=_callback_stream)
-			read_size = 1024 * channels * stream.samplesize
-			for _ in range(20):
-				data = np.frombuffer(process.stdout.read(read_size), dtype='float32')
-				data.shape = -1, channels
-				_q.put_nowait(data)
+			# Converted to the rate and channel count of the speaker's output stream
+			converter = self._converter(samplerate, channels)
 			logger.debug("Starting radio stream...")
-			with stream:
-				timeout = 1024 * 20 / samplerate
-				try:
-					while True:
-						data = np.frombuffer(process.stdout.read(read_size), dtype='float32')
-						data.shape = -1, channels					
-						_q.put(data, timeout=timeout)
-				except KeyboardInterrupt:
+			failed_attempts = 0
+			while True:
+				received, stopped = self._decode(source, channels, samplerate, converter, commands)
+				if stopped:
 					logger.debug("Stopping radio stream...")
-		except queue.Full as e:
-			if self._counter < 3:
-				logger.error(f"Streaming-Queue is full, retry playing: Attempt {self._counter + 1}")
-				self._play_stream(source)
-			else:
-				logger.error("Streaming-Queue is full, could not start radio player.")
+					break
+				failed_attempts = 0 if received else failed_attempts + 1
+				if failed_attempts >= self.max_reconnects:
+					logger.error("Radio stream {} could not be reconnected after {} attempts.", source, failed_attempts)
+					break
+				delay = min(MUSIC_RECONNECT_DELAY * 2 ** failed_attempts, MUSIC_MAX_RECONNECT_DELAY)
+				logger.warning("Radio stream {} dropped, reconnecting in {:.1f} s.", source, delay)
+				self._control.reconnects += 1
+				if commands.poll(delay) and self._stop_requested(commands):
+					break
+		except KeyboardInterrupt:
+			logger.debug("Stopping radio stream...")
 		except Exception as e:
 			logger.error(e)
+		finally:
+			self._control.ended = True
 
 	def stop(self):
 		if self._process:
-			self._process.terminate()
+			self._control.ended = True
+			# Ask the decoder to close ffmpeg and exit, terminate it if it does not react
+			if self._process.is_alive():
+				try:
+					self._commands.send(("stop",))
+				except OSError:
+					pass  # The decoder exited in the meantime, its end of the pipe is gone
+			self._process.join(MUSIC_STOP_TIMEOUT)
+			if self._process.is_alive():
+				self._process.terminate()
+				self._process.join()
+			self._commands.close()
+			self._process = None
+			# Drop the music that is still buffered for the mixer
+			self._speaker.music_ring.flush()
+
+	def seek(self, seconds):
+		"""Jump to the given position of the file being played."""
+		if self._process is not None and self._process.is_alive():
+			try:
+				self._commands.send(("seek", seconds))
+			except OSError:
+				pass  # Playback ended in the meantime
 
 	def is_playing(self):
-		return self._process and self._process.is_alive()
+		return self._process is not None and self._process.is_alive()
+
+	def pause(self):
+		"""Silence the music while keeping the stream connected, see MUSIC_PAUSE_MODE."""
+		self._control.paused = True
+
+	def resume(self):
+		self._control.paused = False
+
+	def is_paused(self):
+		return self._process is not None and self._process.is_alive() and self._control.paused
+
+	def set_muted(self, muted):
+		self._control.muted = muted
 
 	def set_volume(self, volume):
-		self._volume = max(0.0, min(volume, 1.0))
+		self._control.gain = max(0.0, min(volume, 1.0))
 		if volume > 1.0:
 			logger.debug("The volume of the audioplayer is set to the maximum value of 1.0, not {}.", volume)
 
 	def get_volume(self):
-		return self._volume
+		return self._control.gain
+
+	def buffer_health(self):
+		"""Fill level of the music ring and the underrun and reconnect counters of the current player."""
+		ring = self._speaker.music_ring
+		bytes_per_second = self._speaker.output_rate * self._speaker.output_channels * OUTPUT_SAMPLE_SIZE
+		return {
+			"buffered_seconds": round(ring.available() / bytes_per_second, 3),
+			"fill": round(ring.available() / ring.capacity, 3),
+			"prebuffer_seconds": self._control.prebuffer,
+			"buffering": self._control.buffering,
+			"underruns": self._control.underruns,
+			"reconnects": self._control.reconnects,
+		}
 
 
 if __name__ == "__main__":
@@ -2,11 +2,10 @@ import asyncio
 import json
 import websockets
 import time
-import subprocess
 import time
 from loguru import logger
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, AsyncIterator, Any, Callable, Coroutine, Dict
+from typing import AsyncGenerator, AsyncIterator, Any, Awaitable, Callable, Coroutine, Dict
 from pydantic import BaseModel, Field, SecretStr, PrivateAttr
 from langchain_core.tools import BaseTool
 from langchain_core._api import beta
@@ -16,7 +15,10 @@ import io
 
 from utils.websocket_utils import amerge
 from intents import TOOLS
-from utils import PIXEL_RING_PATH, Speaker
+from utils import Speaker
+from utils.earcons import EarconBank
+from utils.constants import EARCON_TOOL_THRESHOLD
+import utils.global_variables as global_variables
 
 DEFAULT_MODEL = "gpt-4o-realtime-preview-2024-10-01"
 DEFAULT_URL = "wss://api.openai.com/v1/realtime"
@@ -81,6 +83,9 @@ class VoiceToolExecutor(BaseModel):
     """
 
     tools_by_name: dict[str, BaseTool]
+    # Called with the tool name when a tool runs longer than slow_tool_threshold seconds, e.g. to play a filler earcon
+    on_slow_tool: Callable[[str], Awaitable[None]] | None = None
+    slow_tool_threshold: float = EARCON_TOOL_THRESHOLD
     _trigger_future: asyncio.Future = PrivateAttr(default_factory=asyncio.Future)
     _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
     _stop: bool = PrivateAttr(default=False)
@@ -125,8 +130,17 @@ class VoiceToolExecutor(BaseModel):
                 f"Failed to parse arguments `{tool_call['arguments']}`. Must be valid JSON."
             )
 
+        async def notify_slow_tool():
+            await asyncio.sleep(self.slow_tool_threshold)
+            await self.on_slow_tool(tool_call["name"])
+
         async def run_tool() -> dict:
-            result = await tool.ainvoke(args)
+            notify_task = asyncio.create_task(notify_slow_tool()) if self.on_slow_tool is not None else None
+            try:
+                result = await tool.ainvoke(args)
+            finally:
+                if notify_task is not None:
+                    notify_task.cancel()
             try:
                 result_str = json.dumps(result)
             except TypeError:
@@ -214,6 +228,7 @@ class OpenAIVoiceReactAgent(BaseModel):
         send_output_chunk: Callable[[str], Coroutine[Any, Any, None]],
         system_start_time: float,
         speaker: Speaker,
+        earcons: EarconBank | None = None,
     ) -> None:
         """
         Connect to the OpenAI API and send/receive messages in real-time.
@@ -222,9 +237,16 @@ class OpenAIVoiceReactAgent(BaseModel):
             A stream of input events (often audio) to send to the model. Usually transports input_audio_buffer.append events from the microphone.
         send_output_chunk: Callable[[str], Coroutine[Any, Any, None]]
             Callback to receive output events (often audio chunks). Usually sends response.audio.delta events to the speaker.
+        earcons: EarconBank | None
+            If given, a filler earcon is played on the speaker while a tool call takes longer than EARCON_TOOL_THRESHOLD.
         """
         tools_by_name = {tool.name: tool for tool in (self.tools or [])}
-        tool_executor = VoiceToolExecutor(tools_by_name=tools_by_name)
+        on_slow_tool = None
+        if earcons is not None:
+            async def on_slow_tool(name: str):
+                logger.debug("Tool '{}' is still running, playing a filler earcon.", name)
+                await earcons.play(speaker, "filler")
+        tool_executor = VoiceToolExecutor(tools_by_name=tools_by_name, on_slow_tool=on_slow_tool)
 
         async with connect(
             model=self.model, 
@@ -325,7 +347,7 @@ class OpenAIVoiceReactAgent(BaseModel):
 
                         elif event_type == "input_audio_buffer.speech_stopped":
                             # Change LEDs
-                            subprocess.run(["python", PIXEL_RING_PATH, "wait_mode"])
+                            global_variables.pixel_ring.set_mode("wait_mode")
                             print("\nSpeech is terminated. Processing...")
 
 
@@ -342,9 +364,8 @@ class OpenAIVoiceReactAgent(BaseModel):
                             logger.info(f"Model: {data['transcript']}")
                             done_with_audio_output = True
 
-                            while(speaker.is_playing()):
-                                await asyncio.sleep(0.5)
-                            subprocess.run(["python", PIXEL_RING_PATH, "turn_off"])
+                            await speaker.drained()
+                            global_variables.pixel_ring.set_mode("turn_off")
                             break
 
 
@@ -358,7 +379,7 @@ class OpenAIVoiceReactAgent(BaseModel):
 
 
                         elif event_type == "response.created":
-                            subprocess.run(["python", PIXEL_RING_PATH, "speak_mode"])
+                            global_variables.pixel_ring.set_mode("speak_mode")
 
                         # elif event_type in EVENTS_TO_IGNORE:
                         #     pass
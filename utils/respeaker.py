@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from typing import Callable, Iterable, NamedTuple
+from loguru import logger
+
+RESPEAKER_VENDOR_ID = 0x2886
+RESPEAKER_PRODUCT_ID = 0x0018
+
+
+class TuningState(NamedTuple):
+    """Latest values read from the ReSpeaker DSP."""
+    direction: int          # direction of arrival in degrees
+    is_voice: bool          # hardware voice activity detection
+    timestamp: float        # time.monotonic() of the read
+    last_voice: float       # time.monotonic() of the last read with voice, 0.0 if none yet
+
+
+class SimulatedTuning:
+    """
+    Stand-in for usb_4_mic_array's Tuning, for tests and machines without the microphone array.
+    Plays back the given (direction, is_voice) samples in a loop.
+    """
+    def __init__(self, samples: Iterable[tuple[int, bool]] = ((0, False),)):
+        self._samples = itertools.cycle(list(samples))
+        self._current = next(self._samples)
+
+    def _advance(self):
+        self._current = next(self._samples)
+
+    @property
+    def direction(self) -> int:
+        self._advance()
+        return self._current[0]
+
+    def is_voice(self) -> int:
+        return int(self._current[1])
+
+    def close(self):
+        pass
+
+
+def open_respeaker():
+    """Find the ReSpeaker USB array and return its Tuning handle, or None if it is not connected."""
+    try:
+        import usb.core
+        from usb_4_mic_array.tuning import Tuning
+    except ImportError as e:
+        logger.debug("ReSpeaker tuning not available: {}", e)
+        return None
+    dev = usb.core.find(idVendor=RESPEAKER_VENDOR_ID, idProduct=RESPEAKER_PRODUCT_ID)
+    return Tuning(dev) if dev else None
+
+
+class TuningService:
+    """
+    Owns the ReSpeaker Tuning handle and polls direction of arrival and voice activity on a background thread.
+    The latest TuningState is published by replacing a single reference, so readers never take a lock
+    and never touch USB. Subscribers are called from the polling thread whenever a value changes.
+    """
+    def __init__(self, backend=None, poll_interval: float = 0.05):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._state = TuningState(0, False, 0.0, 0.0)
+        self._subscribers: tuple[Callable[[TuningState], None], ...] = ()
+        self._subscribers_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def state(self) -> TuningState:
+        return self._state
+
+    @property
+    def direction(self) -> int:
+        return self._state.direction
+
+    def is_voice(self) -> bool:
+        return self._state.is_voice
+
+    def silence_duration(self, since: float = 0.0) -> float:
+        """
+        Seconds since the hardware VAD last detected voice, or since the time.monotonic() value since if that is
+        later. Measured against the current time, so the silence keeps growing if the poller stops.
+        """
+        return max(time.monotonic() - max(self._state.last_voice, since), 0.0)
+
+    def subscribe(self, callback: Callable[[TuningState], None]) -> Callable[[], None]:
+        """Register a callback for state changes. Returns a function that unsubscribes it."""
+        with self._subscribers_lock:
+            self._subscribers = self._subscribers + (callback,)
+
+        def unsubscribe():
+            with self._subscribers_lock:
+                self._subscribers = tuple(s for s in self._subscribers if s is not callback)
+        return unsubscribe
+
+    def start(self):
+        if self.backend is None:
+            self.backend = open_respeaker()
+        if self.backend is None:
+            logger.info("No ReSpeaker microphone array found, tuning service not started.")
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return True
+
+    def _poll(self):
+        while not self._stop_event.is_set():
+            try:
+                direction = self.backend.direction
+                is_voice = bool(self.backend.is_voice())
+            except Exception as e:
+                logger.error("Reading the ReSpeaker tuning values failed: {}", e)
+                self._stop_event.wait(1.0)
+                continue
+            now = time.monotonic()
+            previous = self._state
+            self._state = TuningState(direction, is_voice, now, now if is_voice else previous.last_voice)
+            if direction != previous.direction or is_voice != previous.is_voice:
+                for callback in self._subscribers:
+                    try:
+                        callback(self._state)
+                    except Exception as e:
+                        logger.error("Tuning subscriber failed: {}", e)
+            self._stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
@@ -0,0 +1,171 @@
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from array import array
+import numpy as np
+
+# Header slots (uint32 sequence counters, wrapping modulo 2**32)
+_WRITE = 0      # bytes written so far, owned by the producer
+_READ = 1       # bytes consumed so far, owned by the consumer
+_FLUSH = 2      # producer asks the consumer to skip everything before this position
+_CLOSED = 3     # set to 1 by the producer when no more data will follow
+_WAITING = 4    # set to 1 by the consumer while it sleeps in wait()
+_HEADER_BYTES = 64
+_MASK = 0xFFFFFFFF
+
+
+class SharedRingBuffer:
+    """
+    Lock-free single-producer/single-consumer byte ring in multiprocessing.shared_memory.
+    Each counter has exactly one writer, so no lock is needed. The producer copies PCM straight into the
+    shared buffer and the consumer copies it out; nothing is pickled or sent through a pipe.
+    The capacity must be a power of two. A multiprocessing.Event wakes the consumer when data arrives,
+    it is only signalled while the consumer is actually waiting.
+    """
+    def __init__(self, capacity: int, name: str | None = None, data_ready=None):
+        if capacity & (capacity - 1):
+            raise ValueError("The ring buffer capacity must be a power of two.")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_BYTES + capacity)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            # Only the creating process manages the segment's lifetime
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        # memoryviews instead of numpy arrays: indexing them is cheaper for the small counter accesses
+        self._header = self._shm.buf[:_HEADER_BYTES].cast("I")
+        self._data = self._shm.buf[_HEADER_BYTES:_HEADER_BYTES + capacity]
+        if name is None:
+            self._header[:5] = array("I", [0] * 5)
+        self.data_ready = data_ready if data_ready is not None else multiprocessing.Event()
+
+    def __getstate__(self):
+        # Only the name is sent to the child process, which attaches to the same memory
+        return {"capacity": self.capacity, "name": self._shm.name, "data_ready": self.data_ready}
+
+    def __setstate__(self, state):
+        self.__init__(state["capacity"], name=state["name"], data_ready=state["data_ready"])
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    # --- shared ---
+
+    def available(self) -> int:
+        """Bytes that can be read."""
+        return (self._header[_WRITE] - self._header[_READ]) & _MASK
+
+    def free(self) -> int:
+        """Bytes that can be written."""
+        return self.capacity - self.available()
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._header[_CLOSED])
+
+    # --- producer side ---
+
+    def write(self, data) -> int:
+        """Copy as much of data as fits into the ring. Returns the number of bytes written."""
+        source = memoryview(data).cast("B")
+        count = min(len(source), self.free())
+        if count == 0:
+            return 0
+        write = self._header[_WRITE]
+        start = write & self._mask
+        first = min(count, self.capacity - start)
+        self._data[start:start + first] = source[:first]
+        if count > first:
+            self._data[:count - first] = source[first:count]
+        self._header[_WRITE] = (write + count) & _MASK
+        if self._header[_WAITING]:
+            self.data_ready.set()
+        return count
+
+    def flush(self):
+        """Discard everything written so far. The consumer skips it on its next read."""
+        self._header[_FLUSH] = self._header[_WRITE]
+        self.data_ready.set()
+
+    def close(self):
+        """Tell the consumer that no more data will follow."""
+        self._header[_CLOSED] = 1
+        self.data_ready.set()
+
+    # --- consumer side ---
+
+    def discard_flushed(self) -> int:
+        """Apply a pending flush() request. Returns the number of bytes skipped."""
+        read = self._header[_READ]
+        skipped = (self._header[_FLUSH] - read) & _MASK
+        if 0 < skipped <= self.available():
+            self._header[_READ] = (read + skipped) & _MASK
+            return skipped
+        return 0
+
+    def read_into(self, out: np.ndarray, max_bytes: int | None = None) -> int:
+        """Copy up to len(out) (or max_bytes) bytes into the uint8 array out. Returns the number of bytes read."""
+        count = min(len(out), self.available())
+        if max_bytes is not None:
+            count = min(count, max_bytes)
+        if count == 0:
+            return 0
+        read = self._header[_READ]
+        start = read & self._mask
+        first = min(count, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if count > first:
+            out[first:count] = self._data[:count - first]
+        self._header[_READ] = (read + count) & _MASK
+        return count
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until data is available or the ring is closed. Returns False on timeout."""
+        if self.available() or self.closed:
+            return True
+        self.data_ready.clear()
+        self._header[_WAITING] = 1
+        try:
+            # Re-check after announcing the wait, so a write that did not see the flag is not missed
+            if self.available() or self.closed:
+                return True
+            return self.data_ready.wait(timeout)
+        finally:
+            self._header[_WAITING] = 0
+
+    def _set_waiting(self, waiting: bool):
+        self._header[_WAITING] = int(waiting)
+
+    def release(self):
+        """Detach from the shared memory."""
+        self._header.release()
+        self._data.release()
+        self._shm.close()
+
+    def unlink(self):
+        """Free the shared memory. Called once by the process that created the ring, after release()."""
+        self._shm.unlink()
+
+
+def wait_any(rings, timeout: float | None = None) -> bool:
+    """
+    Like SharedRingBuffer.wait(), for a consumer reading several rings that were created with the same
+    data_ready event. Returns False on timeout.
+    """
+    def ready():
+        return any(ring.available() or ring.closed for ring in rings)
+
+    if ready():
+        return True
+    data_ready = rings[0].data_ready
+    data_ready.clear()
+    for ring in rings:
+        ring._set_waiting(True)
+    try:
+        if ready():
+            return True
+        return data_ready.wait(timeout)
+    finally:
+        for ring in rings:
+            ring._set_waiting(False)
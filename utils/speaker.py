@@ -1,39 +1,253 @@
+import asyncio
+import time
+import numpy as np
 import pyaudio
-from .constants import FORMAT, CHANNELS, RATE
+from .constants import FORMAT, CHANNELS, RATE, SPEAKER_RING_BYTES, SPEAKER_PERIOD_FRAMES, SPEAKER_BLOCK_INTERVAL, SPEAKER_DRAIN_CHECK_INTERVAL, MUSIC_RING_BYTES, MUSIC_DUCK_GAIN, MUSIC_FADE_SECONDS, MUSIC_PAUSE_MODE, MUSIC_PREBUFFER_SECONDS
+from .queues import QueueStats
+from .ring_buffer import SharedRingBuffer, wait_any
+from .audio_devices import get_device_manager
+from .audio_convert import AudioConverter, Reblocker
+from .mixer import Mixer
 
 import multiprocessing
-import pyaudio
+from loguru import logger
+
+# The output stream carries the mix of voice and music as float32
+OUTPUT_FORMAT = pyaudio.paFloat32
+OUTPUT_SAMPLE_SIZE = 4
+
+def _open_output(devices, rate, channels):
+    """Open the default output for the mix. Returns the stream, or None if the device is not available."""
+    try:
+        return devices.open_stream(format=OUTPUT_FORMAT, channels=channels, rate=rate, output=True)
+    except OSError as e:
+        logger.error("Could not open the audio output: {}", e)
+        devices.recover()
+        return None
+
+# Layout of the shared playback status
+STATUS_FRAMES_WRITTEN = 0   # voice frames (at RATE) taken from the ring by the worker, played or dropped
+STATUS_WRITE_TIME = 1       # time.monotonic() when the last write containing voice returned
+STATUS_LATENCY = 2          # output latency of the stream in seconds, i.e. audio still buffered after a write
+
+class _ControlField:
+    """One value of the MusicControl block, stored as a double and read back as kind."""
+    def __init__(self, index: int, kind=float):
+        self.index = index
+        self.kind = kind
+
+    def __get__(self, control, owner=None):
+        if control is None:
+            return self
+        return self.kind(control._values[self.index])
 
-def audio_player_worker(queue):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, output=True)
+    def __set__(self, control, value):
+        control._values[self.index] = float(value)
+
+class MusicControl:
+    """
+    Shared-memory control and status block for the music mixed by the speaker process. The parent writes the
+    controls, the worker reads them once per period, so a change is heard within one period and needs no restart.
+    While paused, the music ring is either left to fill up (MUSIC_PAUSE_MODE "buffer", the decoder then waits
+    with its stream still connected and resumes where it stopped) or drained and dropped ("discard", resumes live).
+    Playback only starts once prebuffer seconds are in the ring, and after an underrun the ring is refilled to
+    that level before the music continues.
+    """
+    gain = _ControlField(0)
+    paused = _ControlField(1, bool)
+    muted = _ControlField(2, bool)
+    ducked = _ControlField(3, bool)
+    discard_while_paused = _ControlField(4, bool)
+    prebuffer = _ControlField(5)                # seconds buffered before the music starts or continues after an underrun
+    ended = _ControlField(6, bool)              # set by the decoder: no more music follows, play out what is left
+    # Buffer health, written by the speaker process and the decoder
+    buffering = _ControlField(7, bool)
+    underruns = _ControlField(8, int)
+    reconnects = _ControlField(9, int)
+
+    def __init__(self, pause_mode: str = MUSIC_PAUSE_MODE, prebuffer: float = MUSIC_PREBUFFER_SECONDS):
+        if pause_mode not in ("buffer", "discard"):
+            raise ValueError(f"Unknown pause mode '{pause_mode}', must be 'buffer' or 'discard'.")
+        self._values = multiprocessing.RawArray('d', 10)
+        self.gain = 1.0
+        self.discard_while_paused = pause_mode == "discard"
+        self.prebuffer = prebuffer
+        self.ended = True
+
+def audio_player_worker(ring, music_ring, status, control, output_rate, output_channels):
+    """
+    Single owner of the audio output. Every period it takes the voice from ring (int16 mono at RATE)
+    and the music from music_ring (float32 frames at the output rate and channel count), mixes them
+    and writes the result. Gain, pause, mute and ducking of the music come from the MusicControl block.
+    """
+    devices = get_device_manager()
+    stream = _open_output(devices, output_rate, output_channels)
+    if stream is not None:
+        status[STATUS_LATENCY] = stream.get_output_latency()
+    frame_size = CHANNELS * devices.get_sample_size(FORMAT)
+    music_frame_size = output_channels * OUTPUT_SAMPLE_SIZE
+    period_frames = SPEAKER_PERIOD_FRAMES * output_rate // RATE
+    voice_bytes = np.empty(SPEAKER_PERIOD_FRAMES * frame_size, dtype=np.uint8)
+    music_bytes = np.empty(period_frames * music_frame_size, dtype=np.uint8)
+    music_block = music_bytes.view(np.float32).reshape(period_frames, output_channels)
+    converter = AudioConverter(RATE, output_rate, CHANNELS, output_channels, out_dtype="float32")
+    voice = Reblocker(period_frames, output_channels)
+    mixer = Mixer(output_rate, output_channels, period_frames, MUSIC_DUCK_GAIN, MUSIC_FADE_SECONDS)
     while True:
-        audio_chunk = queue.get()
-        if audio_chunk is None:  # None signals shutdown.
-            break
-        stream.write(audio_chunk)
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+        skipped = ring.discard_flushed()
+        if skipped:
+            voice.clear()
+            status[STATUS_FRAMES_WRITTEN] += skipped // frame_size
+        music_ring.discard_flushed()
+
+        # Convert voice until one output period is buffered
+        while len(voice) < period_frames and (available := ring.available()) >= frame_size:
+            count = ring.read_into(voice_bytes, available - available % frame_size)
+            voice.push(converter.convert(voice_bytes[:count].view(np.int16)))
+            status[STATUS_FRAMES_WRITTEN] += count // frame_size
+        voice_block = voice.pop(partial=True)
+
+        # While paused in buffer mode the music stays in the ring, the decoder waits until it is resumed.
+        # While buffering, the ring is filled up to the prebuffer level first.
+        available = music_ring.available()
+        if control.buffering:
+            prebuffer_bytes = min(control.prebuffer * output_rate * music_frame_size, music_ring.capacity - len(music_bytes))
+            if available >= prebuffer_bytes or (control.ended and available):
+                control.buffering = False
+        hold_music = control.buffering or (control.paused and not control.discard_while_paused)
+        music_count = 0
+        if not hold_music:
+            music_count = music_ring.read_into(music_bytes, available - available % music_frame_size)
+            if music_count < len(music_bytes) and not control.ended:
+                # Underrun: play what is there, then refill instead of stuttering on every period
+                control.underruns += 1
+                control.buffering = True
+            if music_count and (control.paused or control.muted):
+                # Dropped, but still written as silence so the decoder stays paced by the output
+                music_bytes[:] = 0
+            elif music_count:
+                music_bytes[music_count:] = 0
+
+        if voice_block is None and not music_count:
+            if ring.closed:  # The parent closed the ring, shut down.
+                break
+            if hold_music:
+                # Music is held back, only voice wakes the worker early
+                wait_any((ring,), SPEAKER_PERIOD_FRAMES / RATE)
+            else:
+                wait_any((ring, music_ring), 0.1)
+            continue
+
+        mixer.set_ducked(control.ducked)
+        mixer.set_volume(control.gain)
+        out = mixer.mix(voice_block, music_block if music_count else None, period_frames)
+        if stream is None:
+            # Output device is gone, drop audio until it can be reopened
+            stream = _open_output(devices, output_rate, output_channels)
+            if stream is None:
+                status[STATUS_WRITE_TIME] = time.monotonic()
+                continue
+            status[STATUS_LATENCY] = stream.get_output_latency()
+        try:
+            stream.write(out.tobytes())
+            if voice_block is not None:
+                status[STATUS_WRITE_TIME] = time.monotonic()
+        except OSError as e:
+            logger.warning("Audio output failed ({}), reopening the device.", e)
+            generation = devices.stream_generation(stream)
+            devices.discard(stream)
+            devices.recover(generation)
+            stream = _open_output(devices, output_rate, output_channels)
+    if stream is not None:
+        devices.release(stream)
+    ring.release()
+    music_ring.release()
+    devices.terminate()
 
 class Speaker:
     """
     Class for playing back audio chunks in a dedicated process.
+    Audio is passed through a shared-memory ring buffer. It is bounded: when it is full, play_chunk() waits
+    instead of growing the latency, and flush() drops everything that has not been played yet.
+    The worker reports the frames it has written through shared memory, so the parent knows how much audio
+    is still queued or buffered in PortAudio and when playback actually ends.
+    The process is the only user of the output device: music players write float32 PCM at output_rate with
+    output_channels into music_ring, which is mixed under the voice and ducked with duck().
     """
     def __init__(self):
-        self.queue = multiprocessing.Queue()
-        self.process = multiprocessing.Process(target=audio_player_worker, args=(self.queue,))
+        devices = get_device_manager()
+        self.output_rate = devices.default_rate(output=True)
+        self.output_channels = max(1, min(2, devices.device_info(output=True)["maxOutputChannels"]))
+        self.ring = SharedRingBuffer(SPEAKER_RING_BYTES)
+        self.music_ring = SharedRingBuffer(MUSIC_RING_BYTES, data_ready=self.ring.data_ready)
+        self.stats = QueueStats("speaker", SPEAKER_RING_BYTES)
+        self.status = multiprocessing.RawArray('d', 3)
+        self.music_control = MusicControl()
+        self.frames_queued = 0
+        self._frame_size = CHANNELS * devices.get_sample_size(FORMAT)
+        self.process = multiprocessing.Process(target=audio_player_worker, args=(self.ring, self.music_ring, self.status, self.music_control, self.output_rate, self.output_channels))
         self.process.start()
 
     async def play_chunk(self, audio_chunk: bytes):
-        # Simply put the audio chunk into the queue.
-        self.queue.put(audio_chunk)
+        data = memoryview(audio_chunk)
+        while True:
+            data = data[self.ring.write(data):]
+            if not data:
+                break
+            # Backpressure: yield to the event loop until the playback process catches up
+            self.stats.blocked += 1
+            await asyncio.sleep(SPEAKER_BLOCK_INTERVAL)
+        self.frames_queued += len(audio_chunk) // self._frame_size
+        self.stats.record_put(self.depth())
+
+    def depth(self):
+        """Bytes waiting in the ring buffer."""
+        return self.ring.available()
+
+    def flush(self):
+        """Drop all audio that has not been handed to the output device yet, e.g. on interruption."""
+        self.ring.flush()
+
+    def duck(self, ducked: bool = True):
+        """Fade the music down to MUSIC_DUCK_GAIN (or back up with ducked=False)."""
+        self.music_control.ducked = ducked
+
+    def playback_status(self) -> dict:
+        """Frames queued to, written by and still buffered in the playback process (at RATE)."""
+        written = int(self.status[STATUS_FRAMES_WRITTEN])
+        buffered_seconds = self.status[STATUS_WRITE_TIME] + self.status[STATUS_LATENCY] - time.monotonic()
+        buffered = min(written, max(0, int(buffered_seconds * RATE)))
+        return {
+            "queued": self.frames_queued - written,
+            "written": written,
+            "buffered": buffered,
+            "played": written - buffered,
+        }
+
+    def position(self) -> float:
+        """Seconds of audio that have actually been played out since the speaker was started."""
+        return self.playback_status()["played"] / RATE
+
+    def remaining(self) -> float:
+        """Estimated seconds until everything queued so far has been played."""
+        status = self.playback_status()
+        return (status["queued"] + status["buffered"]) / RATE
+
+    async def drained(self):
+        """
+        Wait until all queued audio has been played. Sleeps for the estimated remaining time (re-checking at
+        least every SPEAKER_DRAIN_CHECK_INTERVAL, e.g. after a flush), so it returns within a few milliseconds
+        of the end of playback.
+        """
+        while (remaining := self.remaining()) > 0 and self.process.is_alive():
+            await asyncio.sleep(min(remaining, SPEAKER_DRAIN_CHECK_INTERVAL))
 
     def is_playing(self):
-        # This approach may require additional signaling to know if playback is in progress.
-        # Here, we just check if the queue has pending items.
-        return not self.queue.empty()
+        return self.remaining() > 0
 
     def close(self):
-        self.queue.put(None)
+        self.ring.close()
         self.process.join()
+        for ring in (self.ring, self.music_ring):
+            ring.release()
+            ring.unlink()
@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import threading
+import time
+from rapidfuzz import process, fuzz
+from loguru import logger
+
+from .spotify_resolver import Resolution, PREFERRED_TYPE_BONUS
+from .constants import SPOTIFY_LIBRARY_PATH, SPOTIFY_LIBRARY_SYNC_INTERVAL, SPOTIFY_LIBRARY_MIN_SCORE
+
+PAGE_LIMIT = 50                 # largest page the Spotify library endpoints return
+LIBRARY_CANDIDATES = 10         # name matches that are scored against the artist and the preferred type
+LIBRARY_KINDS = ("playlist", "album", "track")
+# Version suffixes that are not part of the title the user says: "Song - Remastered 2011", "Song (Live)"
+_NAME_SUFFIX = re.compile(r"\s+-\s+.*$|\s*[(\[][^)\]]*[)\]]")
+
+
+def _artists(item: dict) -> str:
+    return ", ".join(artist["name"] for artist in item.get("artists", []))
+
+
+def _title(name: str) -> str:
+    """Lower-case name without version suffixes, the form the library is matched in."""
+    return _NAME_SUFFIX.sub("", name).strip().lower() or name.lower()
+
+
+def _pages(sp, call, *args, limit=PAGE_LIMIT):
+    """All items of a paginated library endpoint."""
+    page = call(*args, limit=limit)
+    while page:
+        yield from (item for item in page["items"] if item)
+        page = sp.next(page) if page.get("next") else None
+
+
+class SpotifyLibrary:
+    """
+    Local copy of the account's playlists (with their tracks), saved albums and liked tracks.
+    The library is kept as compact [kind, uri, name, artist] rows in a JSON file and searched in memory with
+    rapidfuzz, so a request for something the user owns resolves without a Spotify search.
+    A background thread syncs it every SPOTIFY_LIBRARY_SYNC_INTERVAL seconds: playlist tracks are only
+    downloaded again when the playlist's snapshot_id changed, saved albums and liked tracks only when the
+    newest entry or the total count changed.
+    """
+    def __init__(self, sp, path: str = SPOTIFY_LIBRARY_PATH):
+        self.sp = sp
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._data = {"playlists": {}, "albums": {"head": None, "total": 0, "rows": []},
+                      "tracks": {"head": None, "total": 0, "rows": []}}
+        self._rows: list[list[str]] = []
+        self._names: list[str] = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._data.update(json.load(file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable Spotify library cache {}: {}", self.path, e)
+        self._build_index()
+
+    def _save(self):
+        with self._lock:
+            data = json.dumps(self._data)
+        # Write to a temporary file first, so a crash never leaves a truncated cache
+        tmp_path = self.path + ".tmp"
+        try:
+            with self._save_lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    file.write(data)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error("Could not save the Spotify library cache: {}", e)
+
+    def _build_index(self):
+        rows = []
+        for playlist in self._data["playlists"].values():
+            rows.append(["playlist", playlist["uri"], playlist["name"], playlist["owner"]])
+            rows.extend(playlist["tracks"])
+        rows.extend(self._data["albums"]["rows"])
+        rows.extend(self._data["tracks"]["rows"])
+        # A track that is liked and in several playlists is indexed once
+        rows = list({row[1]: row for row in rows}.values())
+        names = [_title(row[2]) for row in rows]
+        with self._lock:
+            self._rows, self._names = rows, names
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _sync_playlists(self) -> bool:
+        cached = self._data["playlists"]
+        playlists = {}
+        changed = False
+        for item in _pages(self.sp, self.sp.current_user_playlists):
+            entry = cached.get(item["id"])
+            if entry is None or entry["snapshot_id"] != item["snapshot_id"]:
+                tracks = []
+                for track_item in _pages(self.sp, self.sp.playlist_items, item["id"]):
+                    track = track_item.get("track")
+                    if track and track.get("type") == "track" and track.get("uri"):
+                        tracks.append(["track", track["uri"], track["name"], _artists(track)])
+                entry = {"snapshot_id": item["snapshot_id"], "uri": item["uri"], "name": item["name"],
+                         "owner": (item.get("owner") or {}).get("display_name") or "", "tracks": tracks}
+                changed = True
+            playlists[item["id"]] = entry
+        changed = changed or playlists.keys() != cached.keys()
+        with self._lock:
+            self._data["playlists"] = playlists
+        return changed
+
+    def _sync_saved(self, key: str, kind: str, call) -> bool:
+        """Saved albums or liked tracks. The newest entry and the total tell whether anything was added or removed."""
+        cached = self._data[key]
+        first = call(limit=1)
+        head = first["items"][0][kind]["uri"] + " " + first["items"][0]["added_at"] if first["items"] else None
+        if head == cached["head"] and first["total"] == cached["total"]:
+            return False
+        rows = [[kind, item[kind]["uri"], item[kind]["name"], _artists(item[kind])] for item in _pages(self.sp, call)]
+        with self._lock:
+            self._data[key] = {"head": head, "total": first["total"], "rows": rows}
+        return True
+
+    def sync(self):
+        """Bring the local library up to date with the account."""
+        start = time.time()
+        changed = self._sync_playlists()
+        changed |= self._sync_saved("albums", "album", self.sp.current_user_saved_albums)
+        changed |= self._sync_saved("tracks", "track", self.sp.current_user_saved_tracks)
+        if changed:
+            self._build_index()
+            self._save()
+        logger.debug("Spotify library synced in {:.2f} s: {} entries, {}.", time.time() - start, len(self),
+                     "changed" if changed else "unchanged")
+
+    def lookup(self, query: str, artist: str = "", prefer: str | None = None) -> Resolution | None:
+        """
+        Best library entry for the request, or None if no name (blended with the artist) scores SPOTIFY_LIBRARY_MIN_SCORE.
+        The name is compared as a whole, so "rock" does not match "We Will Rock You". The library holds no
+        artists, so a request that prefers an artist is left to the search.
+        """
+        query, artist = query.strip().lower(), artist.strip().lower()
+        with self._lock:
+            rows, names = self._rows, self._names
+        if not query or not names or (prefer is not None and prefer not in LIBRARY_KINDS):
+            return None
+        best = None
+        for _, name_score, index in process.extract(query, names, scorer=fuzz.token_sort_ratio, limit=LIBRARY_CANDIDATES):
+            kind, uri, name, row_artist = rows[index]
+            score = name_score
+            if artist:
+                score = 0.6 * score + 0.4 * fuzz.WRatio(artist, row_artist.lower())
+            # The threshold applies to the match itself, the preferred type only ranks entries that pass it
+            if score < SPOTIFY_LIBRARY_MIN_SCORE:
+                continue
+            if kind == prefer:
+                score += PREFERRED_TYPE_BONUS
+            if best is None or score > best.score:
+                best = Resolution(kind, uri, name, row_artist, score)
+        return best
+
+    def start(self, interval: float = SPOTIFY_LIBRARY_SYNC_INTERVAL):
+        """Sync now and then every interval seconds on a background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning("Syncing the Spotify library failed: {}", e)
+            self._stop_event.wait(interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
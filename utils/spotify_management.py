@@ -1,10 +1,24 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
+from spotipy.exceptions import SpotifyException
 import os
 import dotenv
 from loguru import logger
 import yaml
 import time
+import threading
+from typing import NamedTuple
+
+from .spotify_resolver import SpotifyResolver
+from .spotify_library import SpotifyLibrary
+from .constants import SPOTIFY_DEVICE_NAME, SPOTIFY_REQUEST_TIMEOUT, SPOTIFY_TOKEN_REFRESH_MARGIN, SPOTIFY_POLL_PLAYING, SPOTIFY_POLL_IDLE, SPOTIFY_POLL_AFTER_COMMAND
+
+class PlaybackState(NamedTuple):
+    """Last known playback state of the assistant's Spotify device."""
+    is_playing: bool
+    volume_percent: int | None
+    item_uri: str | None
+    timestamp: float        # time.monotonic() of the last update
 
 class Spotify():
     def __init__(self):
@@ -22,10 +36,19 @@ class Spotify():
 
         Method 2:
         Load environment variables from .env file
+
+        One instance is shared by all modules (global_variables.spotify). The client keeps its HTTP session alive,
+        the access token is refreshed in the background before it expires, and the ID of the playback device is
+        cached and only looked up again when Spotify reports it as unknown.
+        The playback state is tracked in the background: polled every SPOTIFY_POLL_PLAYING seconds while music
+        plays and every SPOTIFY_POLL_IDLE seconds otherwise, and updated right away by our own commands,
+        so is_spotify_playing() never waits for the network.
         """
-        self._is_playing = False
-        self.is_playing_time_limit = 180 # In seconds, timer for how often the variables is_playing is updated
-        self.is_playing_current_time = time.time()
+        self._state = PlaybackState(False, None, None, 0.0)
+        self._state_lock = threading.Lock()
+        self._next_poll = 0.0
+        self._poll_wakeup = threading.Event()
+        self._unducked_volume_percent = None
         dotenv.load_dotenv()
 
         # Get the spotify credentials from environment variables
@@ -34,26 +57,140 @@ class Spotify():
         redirect_uri = os.environ.get('SPOTIPY_REDIRECT_URI')
         scope="user-read-playback-state,user-modify-playback-state,user-read-private,user-read-email,playlist-read-private,playlist-read-collaborative,user-library-read"
 
-        # Initialize Spotipy with your credentials
-        self.sp = spotipy.Spotify(auth_manager=SpotifyOAuth(client_id=client_id, client_secret=client_secret, redirect_uri=redirect_uri, scope=scope))
+        # Initialize Spotipy with your credentials, spotipy reuses one requests.Session (keep-alive) for all calls
+        self.auth_manager = SpotifyOAuth(client_id=client_id, client_secret=client_secret, redirect_uri=redirect_uri, scope=scope)
+        self.sp = spotipy.Spotify(auth_manager=self.auth_manager, requests_timeout=SPOTIFY_REQUEST_TIMEOUT)
+        # The user's own library is synced in the background and resolved locally before any search
+        self.library = SpotifyLibrary(self.sp)
+        self.resolver = SpotifyResolver(self.sp, library=self.library)
         
         # Find the ID of the first recognized device to play spotify on
         self.device_id = None
-        computer_name = "KITCHEN_VA"  # Replace with your computer's Spotify name
+        self.resolve_device()
+
+        self._stop_event = threading.Event()
+        self._token_thread = threading.Thread(target=self._keep_token_fresh, daemon=True)
+        self._token_thread.start()
+        self._tracker_thread = threading.Thread(target=self._track_playback, daemon=True)
+        self._tracker_thread.start()
+        self.library.start()
+
+    def resolve_device(self):
+        """Look up the ID of the device named SPOTIFY_DEVICE_NAME."""
+        self.device_id = None
         devices = self.sp.devices()
         for device in devices['devices']:
             logger.debug("Device name for Spotify: {}", device['name'])
-            if device['name'] == computer_name:
+            if device['name'] == SPOTIFY_DEVICE_NAME:
                 self.device_id = device['id']
                 logger.info("Using Spotify on device: {}", device['name'])
                 break
         if not self.device_id:
             logger.error("No Spotify application detected.")
+        return self.device_id
+
+    def _device_call(self, method, **kwargs):
+        """Run a playback call on the cached device. If Spotify no longer knows the device, resolve it again and retry once."""
+        if self.device_id is None:
+            self.resolve_device()
+        try:
+            return method(device_id=self.device_id, **kwargs)
+        except SpotifyException as e:
+            if e.http_status != 404:
+                raise
+            logger.info("Spotify device {} not found, resolving it again.", self.device_id)
+            self.resolve_device()
+            return method(device_id=self.device_id, **kwargs)
+
+    def start_playback(self, **kwargs):
+        result = self._device_call(self.sp.start_playback, **kwargs)
+        self._command_sent(is_playing=True)
+        return result
+
+    def shuffle(self, state):
+        return self._device_call(self.sp.shuffle, state=state)
+
+    def _keep_token_fresh(self):
+        """Refresh the access token SPOTIFY_TOKEN_REFRESH_MARGIN seconds before it expires, so no command waits for it."""
+        while not self._stop_event.is_set():
+            token_info = self.auth_manager.cache_handler.get_cached_token()
+            if not token_info:
+                self._stop_event.wait(SPOTIFY_TOKEN_REFRESH_MARGIN)
+                continue
+            wait = token_info['expires_at'] - time.time() - SPOTIFY_TOKEN_REFRESH_MARGIN
+            if wait > 0:
+                self._stop_event.wait(wait)
+                continue
+            try:
+                self.auth_manager.refresh_access_token(token_info['refresh_token'])
+                logger.debug("Spotify access token refreshed.")
+            except Exception as e:
+                logger.warning("Refreshing the Spotify access token failed: {}", e)
+                self._stop_event.wait(SPOTIFY_TOKEN_REFRESH_MARGIN / 5)
 
+    @property
+    def state(self) -> PlaybackState:
+        return self._state
+
+    def _set_state(self, **changes):
+        with self._state_lock:
+            self._state = self._state._replace(timestamp=time.monotonic(), **changes)
+
+    def _command_sent(self, **changes):
+        """Apply the expected effect of one of our commands now and confirm it with a poll shortly after."""
+        self._set_state(**changes)
+        self._next_poll = time.monotonic() + SPOTIFY_POLL_AFTER_COMMAND
+        self._poll_wakeup.set()
+
+    def _track_playback(self):
+        while not self._stop_event.is_set():
+            wait = self._next_poll - time.monotonic()
+            if wait > 0:
+                self._poll_wakeup.wait(wait)
+                self._poll_wakeup.clear()
+                continue
+            try:
+                playback = self.sp.current_playback()
+            except Exception as e:
+                logger.warning("Reading the Spotify playback state failed: {}", e)
+                self._next_poll = time.monotonic() + SPOTIFY_POLL_IDLE
+                continue
+            device = (playback or {}).get('device') or {}
+            if device.get('name') == SPOTIFY_DEVICE_NAME:
+                self._set_state(is_playing=bool(playback['is_playing']), volume_percent=device.get('volume_percent'),
+                                item_uri=(playback.get('item') or {}).get('uri'))
+            else:
+                # Nothing plays, or the account plays on another device, which the assistant does not need to duck
+                self._set_state(is_playing=False)
+            self._next_poll = time.monotonic() + (SPOTIFY_POLL_PLAYING if self._state.is_playing else SPOTIFY_POLL_IDLE)
+
+    def close(self):
+        self._stop_event.set()
+        self._poll_wakeup.set()
+        self._token_thread.join()
+        self._tracker_thread.join()
+        self.library.stop()
 
     def stop(self):
-        self.sp.pause_playback(device_id=self.device_id)
-        self._is_playing = False
+        self._device_call(self.sp.pause_playback)
+        self._command_sent(is_playing=False)
+
+    def duck(self, gain):
+        """Lower the volume to gain times its current level, e.g. while Luna is speaking. unduck() restores it."""
+        volume_percent = self._state.volume_percent
+        if self._unducked_volume_percent is not None or volume_percent is None:
+            return
+        self._device_call(self.sp.volume, volume_percent=int(volume_percent * gain))
+        # Only marked as ducked once Spotify took the volume, a failed call leaves the next duck() working
+        self._unducked_volume_percent = volume_percent
+        self._command_sent(volume_percent=int(volume_percent * gain))
+
+    def unduck(self):
+        if self._unducked_volume_percent is None:
+            return
+        self._device_call(self.sp.volume, volume_percent=self._unducked_volume_percent)
+        self._command_sent(volume_percent=self._unducked_volume_percent)
+        self._unducked_volume_percent = None
 
     def _volume_abs_to_percent(self, volume):
         if volume > 2:
@@ -62,29 +199,18 @@ class Spotify():
         return int(volume * 100)
 
     def get_volume(self):
-        return self.volume / 100.
+        volume_percent = self._state.volume_percent
+        return volume_percent / 100. if volume_percent is not None else None
 
     def set_volume(self, volume):
         self.volume_percent = self._volume_abs_to_percent(volume)
-        self.sp.volume(volume_percent=self.volume_percent, device_id=self.device_id)
+        self._device_call(self.sp.volume, volume_percent=self.volume_percent)
+        self._command_sent(volume_percent=self.volume_percent)
         logger.debug("Spotify volume changed to {} percent.", self.volume_percent)
 
     def is_spotify_playing(self):
-        self._update_is_playing()
-        return self._is_playing
-    
-    def _update_is_playing(self):
-        if time.time() - self.is_playing_current_time < self.is_playing_time_limit or self._is_playing == False:
-            return
-        
-        self.is_playing_current_time = time.time()
-        print("Updating is_playing...")
-        current_playback = self.sp.current_playback()
-        if current_playback is not None and current_playback['is_playing']:
-            self._is_playing = True
-        else:
-            self._is_playing = False
+        return self._state.is_playing
 
 
 if __name__ == '__main__':
-    sp = Spotify(0.3)
+    sp = Spotify()
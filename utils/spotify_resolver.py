@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from rapidfuzz import fuzz
+from loguru import logger
+
+from .constants import SPOTIFY_SEARCH_LIMIT, SPOTIFY_RESOLVE_CACHE_SIZE, SPOTIFY_RESOLVE_CACHE_TTL, SPOTIFY_MIN_MATCH_SCORE
+
+SEARCH_TYPES = ("track", "artist", "album", "playlist")
+PREFERRED_TYPE_BONUS = 10       # score added to candidates of the type the request asked for
+
+
+class Resolution(NamedTuple):
+    """A search query resolved to something playable."""
+    kind: str           # track, artist, album or playlist
+    uri: str
+    name: str
+    artist: str         # artist of a track or album, owner of a playlist
+    score: float
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds."""
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _artist_of(kind: str, item: dict) -> str:
+    if kind == "artist":
+        return item["name"]
+    if kind == "playlist":
+        return (item.get("owner") or {}).get("display_name") or ""
+    return ", ".join(artist["name"] for artist in item.get("artists", []))
+
+
+class SpotifyResolver:
+    """
+    Resolves a spoken request to a Spotify URI without guessing the type up front. One search call asks for
+    tracks, artists, albums and playlists at once, every candidate is scored against the query (and the artist,
+    if one was named), and the result is cached, so a repeated request starts playback without a search.
+    If a library (SpotifyLibrary) is given, the user's own playlists, albums and liked tracks are tried first.
+    """
+    def __init__(self, sp, cache_size: int = SPOTIFY_RESOLVE_CACHE_SIZE, ttl: float = SPOTIFY_RESOLVE_CACHE_TTL, library=None):
+        self.sp = sp
+        self.cache = TTLCache(cache_size, ttl)
+        self.library = library
+
+    def score(self, query: str, artist: str, prefer: str | None, kind: str, item: dict) -> float:
+        score = fuzz.WRatio(query, item["name"].lower())
+        if artist:
+            artist_score = fuzz.WRatio(artist, _artist_of(kind, item).lower())
+            score = 0.6 * score + 0.4 * artist_score
+        if kind == prefer:
+            score += PREFERRED_TYPE_BONUS
+        # Popularity (0-100, tracks and artists only) breaks ties between equally named candidates
+        return score + item.get("popularity", 0) / 20
+
+    def search(self, query: str, artist: str = "", types=SEARCH_TYPES) -> list[tuple[str, dict]]:
+        """All (type, item) candidates of one multi-type search."""
+        results = self.sp.search(q=f"{query} {artist}".strip(), limit=SPOTIFY_SEARCH_LIMIT, type=",".join(types))
+        candidates = []
+        for kind in types:
+            for item in results.get(f"{kind}s", {}).get("items", []):
+                if item:  # Spotify returns null entries for unavailable playlists
+                    candidates.append((kind, item))
+        return candidates
+
+    def resolve(self, query: str, artist: str = "", prefer: str | None = None) -> Resolution | None:
+        """Best match for query, or None if nothing scores above SPOTIFY_MIN_MATCH_SCORE."""
+        query, artist = query.strip().lower(), artist.strip().lower()
+        if not query and not artist:
+            return None
+        key = (query, artist, prefer)
+        resolution = self.cache.get(key)
+        if resolution is not None:
+            logger.debug("Spotify request '{}' resolved from cache: {}", query, resolution.uri)
+            return resolution
+
+        if self.library is not None:
+            resolution = self.library.lookup(query, artist, prefer)
+            if resolution is not None:
+                logger.debug("Spotify request '{}' resolved from the library: {} '{}'", query, resolution.kind, resolution.name)
+                self.cache.put(key, resolution)
+                return resolution
+
+        best = None
+        for kind, item in self.search(query, artist):
+            score = self.score(query, artist, prefer, kind, item)
+            if best is None or score > best.score:
+                best = Resolution(kind, item["uri"], item["name"], _artist_of(kind, item), score)
+        if best is None or best.score < SPOTIFY_MIN_MATCH_SCORE:
+            return None
+        logger.debug("Spotify request '{}' resolved to {} '{}' with a score of {:.0f}", query, best.kind, best.name, best.score)
+        self.cache.put(key, best)
+        return best
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from loguru import logger
+
+from .constants import STATION_CACHE_PATH, STATION_PROBE_TIMEOUT, STATION_REFRESH_INTERVAL, STATION_RETRY_INTERVAL, STATION_MAX_RETRY_INTERVAL
+
+
+def probe_station(url: str, timeout: float = STATION_PROBE_TIMEOUT) -> dict:
+    """Ask ffprobe for the first audio stream of url. Raises on network or format errors."""
+    import ffmpeg
+    info = ffmpeg.probe(url, timeout=timeout)
+    for stream in info.get('streams', []):
+        if stream.get('codec_type') == 'audio':
+            return {
+                "codec": stream.get('codec_name'),
+                "channels": int(stream['channels']),
+                "sample_rate": int(float(stream['sample_rate'])),
+            }
+    raise ValueError(f"No audio stream found in {url}.")
+
+
+class StationCache:
+    """
+    Persistent per-URL cache of stream format (codec, channels, sample rate) and last-known health.
+    Starting a known station needs no ffprobe round trip. A background thread re-probes stations,
+    healthy ones every STATION_REFRESH_INTERVAL and failing ones with exponential backoff.
+    """
+    def __init__(self, path: str = STATION_CACHE_PATH, probe=probe_station):
+        self.path = path
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()      # the checker thread and callers both save
+        self._entries: dict[str, dict] = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._urls: list[str] = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._entries = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable station cache {}: {}", self.path, e)
+
+    def _save(self):
+        with self._lock:
+            data = json.dumps(self._entries, indent=2)
+        # Write to a temporary file first, so a crash never leaves a truncated cache
+        tmp_path = self.path + ".tmp"
+        try:
+            with self._save_lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    file.write(data)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error("Could not save the station cache: {}", e)
+
+    def get(self, url: str) -> dict | None:
+        """Cached format of url, or None if it was never probed successfully."""
+        with self._lock:
+            entry = self._entries.get(url)
+            return dict(entry) if entry and entry.get("channels") else None
+
+    def is_healthy(self, url: str) -> bool | None:
+        """Result of the last probe, None if the station is unknown."""
+        with self._lock:
+            entry = self._entries.get(url)
+            return entry["healthy"] if entry else None
+
+    def probe(self, url: str) -> dict | None:
+        """Probe url now and record the result. Returns the stream format, or None if the station failed."""
+        now = time.time()
+        try:
+            stream_format = self._probe(url)
+        except Exception as e:
+            with self._lock:
+                entry = self._entries.setdefault(url, {"healthy": False, "failures": 0})
+                entry["healthy"] = False
+                entry["failures"] = entry.get("failures", 0) + 1
+                entry["last_checked"] = now
+                entry["next_check"] = now + min(STATION_RETRY_INTERVAL * 2 ** (entry["failures"] - 1), STATION_MAX_RETRY_INTERVAL)
+            logger.warning("Radio station {} failed the probe: {}", url, e)
+            self._save()
+            return None
+        with self._lock:
+            self._entries[url] = {
+                **stream_format,
+                "healthy": True,
+                "failures": 0,
+                "last_checked": now,
+                "next_check": now + STATION_REFRESH_INTERVAL,
+            }
+        self._save()
+        return stream_format
+
+    def lookup(self, url: str) -> dict | None:
+        """Cached format of url, probing it only on a cache miss."""
+        return self.get(url) or self.probe(url)
+
+    def mark_failed(self, url: str):
+        """Record a failure seen during playback, so the station is re-probed with backoff."""
+        with self._lock:
+            entry = self._entries.setdefault(url, {"failures": 0})
+            entry["healthy"] = False
+            entry["failures"] = entry.get("failures", 0) + 1
+            entry["next_check"] = time.time() + STATION_RETRY_INTERVAL
+        self._save()
+
+    def order(self, urls: list[str]) -> list[str]:
+        """urls sorted healthy first, then unknown, then known-dead stations."""
+        rank = {True: 0, None: 1, False: 2}
+        return sorted(urls, key=lambda url: rank[self.is_healthy(url)])
+
+    def start(self, urls: list[str]):
+        """Probe the given stations in the background whenever their next check is due."""
+        self._urls = list(dict.fromkeys(urls))
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh, daemon=True)
+        self._thread.start()
+
+    def _refresh(self):
+        while not self._stop_event.is_set():
+            now = time.time()
+            with self._lock:
+                due = [url for url in self._urls if self._entries.get(url, {}).get("next_check", 0) <= now]
+            for url in due:
+                if self._stop_event.is_set():
+                    return
+                self.probe(url)
+            self._stop_event.wait(STATION_RETRY_INTERVAL)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+import yaml
+from rapidfuzz import process, fuzz
+from loguru import logger
+
+from .constants import RADIO_CONFIG_PATH
+
+# Spoken numbers are matched as digits, so "Radio Eins", "radio one" and "Radio 1" are the same key
+NUMBER_WORDS = {
+    "null": "0", "zero": "0",
+    "ein": "1", "eins": "1", "eine": "1", "one": "1",
+    "zwei": "2", "two": "2",
+    "drei": "3", "three": "3",
+    "vier": "4", "four": "4",
+    "fuenf": "5", "five": "5",
+    "sechs": "6", "six": "6",
+    "sieben": "7", "seven": "7",
+    "acht": "8", "eight": "8",
+    "neun": "9", "nine": "9",
+    "zehn": "10", "ten": "10",
+    "achtziger": "80er", "eighties": "80er",
+    "neunziger": "90er", "nineties": "90er",
+    "zweitausender": "2000er", "nullerjahre": "2000er",
+}
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_WORD = re.compile(r"[^a-z0-9.]+")
+
+
+def normalize(name: str) -> str:
+    """Lower case, umlauts folded, punctuation removed and number words replaced by digits."""
+    words = _NON_WORD.sub(" ", name.lower().translate(UMLAUTS)).split()
+    return " ".join(NUMBER_WORDS.get(word, word) for word in words)
+
+
+class StationIndex:
+    """
+    The radio stations of config_start_radio.yaml, compiled once into a table of normalized names and aliases.
+    An exact hit is a dict lookup, everything else goes through rapidfuzz.process.extractOne over the
+    precomputed keys. The file is only parsed again when its modification time changes.
+    Optional aliases are read from intent.start_radio.aliases (alias: station name), optional local audio files
+    from intent.start_radio.file_name (name: path) and the replies for an unknown name from
+    intent.start_radio.<language>.unknown_name.
+    """
+    def __init__(self, path: str = RADIO_CONFIG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._stations: dict[str, str] = {}
+        self._keys: list[str] = []
+        self._key_to_station: dict[str, str] = {}
+        self._files: dict[str, str] = {}
+        self._file_keys: list[str] = []
+        self._key_to_file: dict[str, str] = {}
+        self._replies: dict[str, list[str]] = {}
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error("Radio station list {} not readable: {}", self.path, e)
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.path, "r", encoding="utf-8") as file:
+                config = yaml.load(file, Loader=yaml.FullLoader)['intent']['start_radio']
+            stations = config['radio_station']
+            key_to_station = {normalize(name): name for name in stations}
+            for alias, name in (config.get('aliases') or {}).items():
+                if name in stations:
+                    key_to_station.setdefault(normalize(alias), name)
+                else:
+                    logger.warning("Alias '{}' refers to the unknown radio station '{}'.", alias, name)
+            files = config.get('file_name') or {}
+            self._stations = stations
+            self._key_to_station = key_to_station
+            self._keys = list(key_to_station)
+            self._files = files
+            self._key_to_file = {normalize(name): name for name in files}
+            self._file_keys = list(self._key_to_file)
+            self._replies = {language: list(section.get('unknown_name') or []) for language, section in config.items()
+                             if isinstance(section, dict) and 'unknown_name' in section}
+            self._mtime = mtime
+            logger.debug("Radio station index loaded: {} stations, {} keys.", len(stations), len(self._keys))
+
+    def stations(self) -> dict[str, str]:
+        """Station name to stream URL."""
+        self._refresh()
+        return self._stations
+
+    def unknown_name_replies(self, language: str) -> list[str]:
+        """Replies for a station name that matches nothing, empty if the file has none for language."""
+        self._refresh()
+        return self._replies.get(language, [])
+
+    @staticmethod
+    def _match(key: str, keys: list[str], key_to_name: dict[str, str], score_cutoff: float) -> str | None:
+        name = key_to_name.get(key)
+        if name is None:
+            match = process.extractOne(key, keys, scorer=fuzz.ratio, score_cutoff=score_cutoff)
+            if match is None:
+                return None
+            name = key_to_name[match[0]]
+            logger.debug("Found radio station: {} with a score of {}", name, round(match[1]))
+        return name
+
+    def lookup(self, query: str, score_cutoff: float = 50) -> tuple[str | None, str | None]:
+        """Best matching (station name, URL) for a spoken query, or (None, None) below score_cutoff."""
+        self._refresh()
+        name = self._match(normalize(query), self._keys, self._key_to_station, score_cutoff)
+        return (name, self._stations[name]) if name is not None else (None, None)
+
+    def lookup_file(self, query: str, score_cutoff: float = 50) -> tuple[str | None, str | None]:
+        """Best matching (name, path) of the local audio files, or (None, None) below score_cutoff."""
+        self._refresh()
+        name = self._match(normalize(query), self._file_keys, self._key_to_file, score_cutoff)
+        return (name, self._files[name]) if name is not None else (None, None)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_station_index() -> StationIndex:
+    """Return the shared station index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = StationIndex()
+        return _index
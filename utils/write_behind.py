@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from loguru import logger
+
+from .backend_replica import get_backend_replica
+from .constants import WRITE_BEHIND_PATH, WRITE_BEHIND_RETRY_DELAY, WRITE_BEHIND_MAX_RETRY_DELAY, WRITE_BEHIND_COMPACT_BYTES
+
+
+def _coalesce_key(collection: str, item: dict) -> tuple:
+    """Additions of the same product, unit and list are merged into one."""
+    return collection, str(item.get("Name", "")).strip().lower(), item.get("Unit"), item.get("List")
+
+
+class WriteBehindQueue:
+    """
+    Durable queue of additions to the storage server. enqueue() appends the item to an append-only log on disk
+    (one JSON record per line, fsynced) and returns at once; the item is visible in the replica right away
+    through its overlay. A flusher thread posts queued items with exponential backoff, and an item that is
+    added again before it was sent is merged into the queued one (amounts summed) instead of posted twice.
+    Items that were still queued when the assistant stopped are replayed from the log on the next start.
+    """
+    def __init__(self, path: str = WRITE_BEHIND_PATH, replica=None):
+        self.path = path
+        self.replica = replica if replica is not None else get_backend_replica()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pending: dict[int, dict] = {}     # seq -> {"collection", "item", "attempts", "next_try"}
+        self._in_flight: set[int] = set()
+        self._seq = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._replay()
+        for name in ("storage", "shopping_list"):
+            getattr(self.replica, name).overlay = lambda name=name: self.pending_items(name)
+
+    def _replay(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break   # a torn last line from a crash, everything before it is valid
+                    self._seq = max(self._seq, record["seq"])
+                    if record["op"] == "done":
+                        self._pending.pop(record["seq"], None)
+                    else:
+                        self._pending[record["seq"]] = {"collection": record["collection"], "item": record["item"],
+                                                        "attempts": 0, "next_try": 0.0}
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error("Could not read the write-behind log {}: {}", self.path, e)
+        if self._pending:
+            logger.info("Replaying {} queued additions from {}.", len(self._pending), self.path)
+        self._compact()
+
+    def _append(self, record: dict):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _compact(self):
+        """Rewrite the log with only the queued items, atomically."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            for seq, entry in self._pending.items():
+                file.write(json.dumps({"op": "add", "seq": seq, "collection": entry["collection"], "item": entry["item"]}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def enqueue(self, collection: str, item: dict):
+        """Queue an addition to collection ("storage" or "shopping_list"). Returns once it is on disk."""
+        key = _coalesce_key(collection, item)
+        with self._lock:
+            for seq, entry in self._pending.items():
+                if seq in self._in_flight or _coalesce_key(entry["collection"], entry["item"]) != key:
+                    continue
+                merged = {**entry["item"], "Amount": entry["item"].get("Amount", 0) + item.get("Amount", 0)}
+                # Same seq: on replay the later record replaces the earlier one
+                self._append({"op": "add", "seq": seq, "collection": collection, "item": merged})
+                entry["item"] = merged
+                break
+            else:
+                self._seq += 1
+                self._append({"op": "add", "seq": self._seq, "collection": collection, "item": item})
+                self._pending[self._seq] = {"collection": collection, "item": item, "attempts": 0, "next_try": 0.0}
+        getattr(self.replica, collection).rebuild()
+        self._wakeup.set()
+
+    def pending_items(self, collection: str) -> list[dict]:
+        with self._lock:
+            return [entry["item"] for entry in self._pending.values() if entry["collection"] == collection]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Send every queued item that is due. Returns the number of items the server accepted."""
+        now = time.monotonic()
+        with self._lock:
+            due = {seq: entry for seq, entry in self._pending.items() if entry["next_try"] <= now and seq not in self._in_flight}
+            self._in_flight.update(due)
+        accepted = 0
+        for name in ("storage", "shopping_list"):
+            batch = [(seq, entry) for seq, entry in due.items() if entry["collection"] == name]
+            if batch:
+                accepted += self._send(name, batch)
+        return accepted
+
+    def _send(self, name: str, batch: list) -> int:
+        collection = getattr(self.replica, name)
+        items = [entry["item"] for _, entry in batch]
+        results = collection.post_many(items)
+        accepted = 0
+        with self._lock:
+            for (seq, entry), result in zip(batch, results):
+                self._in_flight.discard(seq)
+                status = None if isinstance(result, Exception) else result.status_code
+                if status is not None and status < 500 and status not in (200, 201):
+                    # Rejected by the server, retrying would not change the answer
+                    logger.error("The server rejected {} for {} with status {}, dropping it.", entry["item"], name, status)
+                elif status is None or status >= 500:
+                    entry["attempts"] += 1
+                    delay = min(WRITE_BEHIND_RETRY_DELAY * 2 ** (entry["attempts"] - 1), WRITE_BEHIND_MAX_RETRY_DELAY)
+                    entry["next_try"] = time.monotonic() + delay
+                    logger.warning("Adding {} to {} failed ({}), retrying in {:.0f} s.", entry["item"].get("Name"), name,
+                                   result if status is None else status, delay)
+                    continue
+                else:
+                    accepted += 1
+                self._append({"op": "done", "seq": seq})
+                del self._pending[seq]
+            if not self._pending and os.path.getsize(self.path) > WRITE_BEHIND_COMPACT_BYTES:
+                self._compact()
+        # The accepted items move from the overlay into the copy in one rebuild
+        collection.insert(items, results)
+        return accepted
+
+    def start(self):
+        """Send queued items on a background thread as soon as they are added or their retry is due."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Flushing the write-behind queue failed: {}", e)
+            with self._lock:
+                next_try = min((entry["next_try"] for entry in self._pending.values()), default=None)
+            timeout = None if next_try is None else max(0.0, next_try - time.monotonic())
+            self._wakeup.wait(timeout)
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """Return the shared write-behind queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehindQueue()
+        return _queue